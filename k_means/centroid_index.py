@@ -1,7 +1,7 @@
 """
 Criado por: Marcelo Jantsch Wille
 Email: marcelojantschwille@gmail.com
-Última modificação: 04/11/2021
+Última modificação: 19/10/2026
 Descrição: Validação da implementação do k-means pelo 'Centroid Index' (centróides órfãos).
 """
 
@@ -9,9 +9,11 @@ Descrição: Validação da implementação do k-means pelo 'Centroid Index' (ce
 from csv import reader
 from copy import deepcopy
 from math import inf
+import numpy as np
 
 # Módulos do projeto
 from k_means import K_means
+from coreset import build_coreset, best_on_coreset, refine
 
 # Arquivo com dados
 DATA_PATH  = "../data/benchmark_instances.csv"
@@ -23,6 +25,7 @@ CENTROIDS_PATH = "../data/benchmark_centroids_groundtruth.csv"
 
 K = 15    # Valor de 'K' com o qual o algoritmo K-means será executado
 I = 100   # Número de iterações para cálculo da menor distância intracluster de certo 'k'
+CORESET_SIZE = 1000   # Tamanho do coreset usado nas iterações (None para usar todos os dados)
 
 def get_lowest_wss_centroids(k, original_data):
 	"""
@@ -30,8 +33,15 @@ def get_lowest_wss_centroids(k, original_data):
 	o modelo um certo número de vezes para um determinado valor
 	de 'k'. Retorna centróides do modelo com menor distância
 	intracluster encontrada dentre todas essas iterações com esse 'k'.
+	Com coreset, as iterações rodam nele e a melhor solução é
+	refinada nos dados completos.
 	"""
 
+	if CORESET_SIZE:
+		coreset = build_coreset(original_data, CORESET_SIZE, "euclidian")
+		positions = best_on_coreset(k, coreset, I, "euclidian")
+		return refine(k, original_data, positions, "euclidian").centroids
+
 	lowest_wss = inf
 	lowest_centroids = {}
 
@@ -48,13 +58,31 @@ def get_lowest_wss_centroids(k, original_data):
 	return lowest_centroids    # Centróides do modelo com menor WSS
 
 
-def centroid_distance(ci, cj):
-	""" Calcula distância entre dois centróides, um da execução e um do ground truth """
-	distance = 0
-	for i, j in zip(ci, cj):
-		distance += abs(i - j)
+def centroid_distances(centroids_a, centroids_b):
+	"""
+	Calcula matriz com a distância entre cada par de centróides dos dois conjuntos
+	(quadrado da soma das diferenças absolutas dos atributos).
+	"""
+	a = np.asarray(centroids_a, dtype=float)
+	b = np.asarray(centroids_b, dtype=float)
+	return np.abs(a[:, None, :] - b[None, :, :]).sum(axis=2) ** 2
+
+
+
+def centroid_index(centroids_a, centroids_b):
+	"""
+	Calcula o 'Centroid Index' de A para B: cada centróide de A aponta para o centróide
+	mais próximo de B, e o índice é o número de centróides de B que ficaram órfãos.
+	"""
+	closest = centroid_distances(centroids_a, centroids_b).argmin(axis=1)
+	orphans = np.bincount(closest, minlength=len(centroids_b))
+	return int((orphans == 0).sum())
+
 
-	return distance ** 2
+
+def symmetric_centroid_index(centroids_a, centroids_b):
+	""" Versão simétrica do 'Centroid Index': maior valor entre as duas direções. """
+	return max(centroid_index(centroids_a, centroids_b), centroid_index(centroids_b, centroids_a))
 
 
 if __name__ == '__main__':
@@ -87,25 +115,9 @@ if __name__ == '__main__':
 		for line in csv_reader:
 			ground_truths.append([float(n) for n in line])
 
-	# Lista contendo quantos centróides do groud truth tem centróide considerados mais próximos
-	# Um índice que permanece 0 é um centróide órfão
-	orphans = [0] * len(ground_truths)
-
-	# Calcula distâncias dos centróides mais próximos entre os centrídes
-	# obtidos na execução e os centróides em groud truth
-	for centroid in centroids.values():
-		closest_centroid = {
-			"index": -1,
-			"distance": inf,
-		}
-		for i, ground_truth in enumerate(ground_truths):
-			distance = centroid_distance(centroid['position'], ground_truth)
-			if distance < closest_centroid['distance']:
-				closest_centroid['index'] = i
-				closest_centroid['distance'] = distance
-
-		orphans[closest_centroid['index']] += 1
-
-	# calcula dissimilaridade dos conjuntos de centróides contando o número de órfãos
-	CI = orphans.count(0)
+	# Calcula dissimilaridade dos conjuntos de centróides contando o número de órfãos
+	# do ground truth quando cada centróide obtido aponta para o seu mais próximo
+	positions = [centroid['position'] for centroid in centroids.values()]
+	CI = centroid_index(positions, ground_truths)
 	print(f"Centroid Index = {CI}")
+	print(f"Centroid Index simétrico = {symmetric_centroid_index(positions, ground_truths)}")
@@ -0,0 +1,142 @@
+"""
+Criado por: Marcelo Jantsch Wille
+Email: marcelojantschwille@gmail.com
+Última modificação: 19/10/2026
+Descrição: Avaliação da qualidade do k-means pelo 'Centroid Index' para várias
+configurações (valor de 'k', método de inicialização e semente aleatória). As execuções
+rodam em paralelo e, para cada configuração, é gerada a distribuição do CI e do tempo.
+"""
+
+# Módulos de Python
+from csv import reader, writer
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from itertools import product
+from statistics import mean, pstdev
+from time import perf_counter
+import os
+import random
+
+# Módulos do projeto
+from k_means import K_means
+from centroid_index import centroid_index, symmetric_centroid_index
+
+# Arquivo com dados
+DATA_PATH  = "../data/benchmark_instances.csv"
+# Booleano que indica se arquivo possui cabeçalho
+HAS_HEADER = False
+# Arquivo com centróides 'ground truth'
+CENTROIDS_PATH = "../data/benchmark_centroids_groundtruth.csv"
+# Arquivo onde o resultado de cada execução é salvo
+OUTPUT_PATH = "../data/ci_benchmark.csv"
+
+K_VALUES = [15]                   # Valores de 'k' avaliados
+INITS    = ["random", "kmeans++"] # Métodos de inicialização dos centróides avaliados
+SEEDS    = range(30)              # Sementes aleatórias (uma execução do k-means por semente)
+N_JOBS   = os.cpu_count()         # Número de processos que executam as configurações
+
+# Dados compartilhados com os processos (preenchidos uma vez por processo no 'init_worker')
+_data = None
+_ground_truths = None
+
+
+def init_worker(data, ground_truths):
+	""" Guarda dados e centróides 'ground truth' no processo, evitando enviá-los a cada tarefa. """
+	global _data, _ground_truths
+	_data = data
+	_ground_truths = ground_truths
+
+
+
+def run_configuration(k, init, seed):
+	""" Executa o k-means com uma configuração e retorna o CI (nas duas direções) e o tempo. """
+	random.seed(seed)
+
+	start = perf_counter()
+	model = K_means(k, deepcopy(_data), init = init)
+	model.run()
+	runtime = perf_counter() - start
+
+	positions = [centroid['position'] for centroid in model.centroids.values()]
+	return {
+		'k': k,
+		'init': init,
+		'seed': seed,
+		'ci': centroid_index(positions, _ground_truths),
+		'ci_inverse': centroid_index(_ground_truths, positions),
+		'ci_symmetric': symmetric_centroid_index(positions, _ground_truths),
+		'runtime': runtime,
+	}
+
+
+
+def run_benchmark(data, ground_truths, k_values = K_VALUES, inits = INITS, seeds = SEEDS, n_jobs = N_JOBS):
+	""" Executa todas as combinações de configurações em paralelo. Retorna lista com os resultados. """
+	configurations = list(product(k_values, inits, seeds))
+
+	with ProcessPoolExecutor(max_workers = n_jobs,
+									 initializer = init_worker,
+									 initargs = (data, ground_truths)) as executor:
+		results = list(executor.map(run_configuration, *zip(*configurations)))
+
+	return results
+
+
+
+def summarize(results):
+	""" Agrupa resultados por configuração (k, inicialização) com a distribuição do CI e do tempo. """
+	groups = {}
+	for result in results:
+		groups.setdefault((result['k'], result['init']), []).append(result)
+
+	summary = {}
+	for configuration, runs in groups.items():
+		cis = [run['ci_symmetric'] for run in runs]
+		runtimes = [run['runtime'] for run in runs]
+		summary[configuration] = {
+			'runs': len(runs),
+			'ci_distribution': dict(sorted(Counter(cis).items())),
+			'ci_mean': mean(cis),
+			'ci_zero': cis.count(0) / len(cis),
+			'runtime_mean': mean(runtimes),
+			'runtime_stdev': pstdev(runtimes),
+		}
+	return summary
+
+
+
+if __name__ == '__main__':
+	# Lê dados do arquivo
+	data = []
+	with open(DATA_PATH, 'r') as fp:
+		csv_reader = reader(fp, delimiter=',')
+		for line in csv_reader:
+			data.append(line)
+
+	# Eliminar headers, pois objeto K_means exige dados passados sem eles
+	if HAS_HEADER:
+		data = data[1:]
+
+	# Lê do arquivo os centróides 'ground truth'
+	ground_truths = []
+	with open(CENTROIDS_PATH, 'r') as fp:
+		csv_reader = reader(fp, delimiter=',')
+		for line in csv_reader:
+			ground_truths.append([float(n) for n in line])
+
+	results = run_benchmark(data, ground_truths)
+
+	# Salva resultado de cada execução
+	with open(OUTPUT_PATH, 'w', newline='') as fp:
+		csv_writer = writer(fp)
+		csv_writer.writerow(results[0].keys())
+		for result in results:
+			csv_writer.writerow(result.values())
+
+	# Imprime distribuição do CI simétrico e tempo de cada configuração
+	for (k, init), info in summarize(results).items():
+		print(f"k={k} init={init} ({info['runs']} execuções)")
+		print(f"  CI: distribuição={info['ci_distribution']} média={info['ci_mean']:.2f} "
+				f"sucesso (CI=0)={info['ci_zero']*100:.1f}%")
+		print(f"  tempo: {info['runtime_mean']:.3f}s ± {info['runtime_stdev']:.3f}s")
@@ -0,0 +1,161 @@
+"""
+Criado por: Marcelo Jantsch Wille
+Email: marcelojantschwille@gmail.com
+Última modificação: 19/10/2026
+Descrição: Plots dos clusters para datasets grandes. Cada par de atributos é desenhado
+como raster de densidade (pontos agrupados em células) ou como subamostra estratificada
+por cluster, e as figuras são geradas em paralelo com backend não interativo.
+"""
+
+# Módulos de Python
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import os
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
+
+OUTPUT_DIR = "../img/analysis"   # Pasta onde os gráficos dos pares de atributos são salvos
+BINS = 200                       # Número de células em cada eixo do raster de densidade
+MAX_POINTS = 2000                # Máximo de pontos plotados por cluster na subamostra
+N_JOBS = os.cpu_count()          # Número de processos que geram as figuras
+
+# Dados compartilhados com os processos (preenchidos uma vez por processo no 'init_worker')
+_columns = None
+_clusters = None
+_colors = None
+
+
+def model_columns(model):
+	"""
+	Converte as instâncias do modelo em matriz de colunas numéricas (atributos categóricos
+	viram seus códigos) e retorna também o cluster de cada instância e os rótulos dos códigos.
+	"""
+	columns = np.empty((len(model.data), len(model.data_types)))
+	tick_labels = {}
+	for i, data_type in enumerate(model.data_types):
+		values = [instance[i] for instance in model.data]
+		if data_type == "numeric":
+			columns[:, i] = values
+		else:
+			codes = model.encodings[i]
+			columns[:, i] = [codes[value] for value in values]
+			tick_labels[i] = list(codes)
+
+	clusters = np.array([instance[-1] for instance in model.data], dtype=np.int32)
+	return columns, clusters, tick_labels
+
+
+
+def stratified_sample(clusters, max_points, seed = 0):
+	""" Retorna índices de no máximo 'max_points' instâncias sorteadas de cada cluster. """
+	rng = np.random.default_rng(seed)
+	indexes = []
+	for cluster in np.unique(clusters):
+		members = np.flatnonzero(clusters == cluster)
+		if len(members) > max_points:
+			members = rng.choice(members, max_points, replace=False)
+		indexes.append(members)
+	return np.concatenate(indexes)
+
+
+
+def axis_edges(values, n_categories = None, bins = BINS):
+	"""
+	Limites das células de um eixo: 'bins' células iguais para atributo numérico
+	ou uma célula centrada em cada código para atributo categórico.
+	"""
+	if n_categories:
+		return np.arange(n_categories + 1) - 0.5
+	low, high = values.min(), values.max()
+	return np.linspace(low, high if high > low else low + 1, bins + 1)
+
+
+
+def density_raster(x, y, clusters, colors, x_edges, y_edges):
+	"""
+	Agrupa os pontos nas células definidas pelos limites dos eixos. Cada célula recebe a cor
+	do cluster com mais pontos nela e opacidade proporcional ao logaritmo do número de pontos.
+	Retorna imagem RGBA e os limites dos eixos.
+	"""
+
+	# Histograma 2D de cada cluster
+	counts = np.stack([
+		np.histogram2d(x[clusters == j], y[clusters == j], bins=[x_edges, y_edges])[0]
+		for j in range(len(colors))
+	])
+
+	total = counts.sum(axis=0)
+	dominant = counts.argmax(axis=0)
+	rgb = np.array([mcolors.to_rgb(color) for color in colors])
+
+	image = np.zeros(total.shape + (4,))
+	image[..., :3] = rgb[dominant]
+	image[..., 3] = np.log1p(total) / np.log1p(total.max() or 1)
+
+	# Eixo y da imagem cresce para baixo, então transpõe e inverte as linhas
+	return image.transpose(1, 0, 2)[::-1], [x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]]
+
+
+
+def init_worker(columns, clusters, colors):
+	""" Guarda os dados no processo e troca para backend não interativo. """
+	global _columns, _clusters, _colors
+	_columns = columns
+	_clusters = clusters
+	_colors = colors
+	plt.switch_backend("Agg")
+
+
+
+def render_pair(attr_x, attr_y, mode, tick_labels, output_dir):
+	""" Gera e salva figura de um par de atributos ('raster' ou 'sample'). """
+	xi, x_label = attr_x
+	yi, y_label = attr_y
+	x = _columns[:, xi]
+	y = _columns[:, yi]
+
+	fig = plt.figure()
+	if mode == "raster":
+		x_edges = axis_edges(x, len(tick_labels.get(xi, [])))
+		y_edges = axis_edges(y, len(tick_labels.get(yi, [])))
+		image, extent = density_raster(x, y, _clusters, _colors, x_edges, y_edges)
+		plt.imshow(image, extent=extent, aspect='auto', interpolation='nearest')
+	else:
+		indexes = stratified_sample(_clusters, MAX_POINTS)
+		for j, color in enumerate(_colors):
+			members = indexes[_clusters[indexes] == j]
+			plt.scatter(x[members], y[members], color=color, marker='o', rasterized=True)
+
+	# Atributos categóricos mostram os valores originais nos eixos
+	if xi in tick_labels:
+		plt.xticks(range(len(tick_labels[xi])), tick_labels[xi])
+	if yi in tick_labels:
+		plt.yticks(range(len(tick_labels[yi])), tick_labels[yi])
+
+	plt.xlabel(x_label)
+	plt.ylabel(y_label)
+	plt.grid()
+
+	path = f"{output_dir}/{x_label}_{y_label}.png"
+	plt.savefig(path)
+	plt.close(fig)
+	return path
+
+
+
+def render_pairs(model, attrs, mode = "raster", output_dir = OUTPUT_DIR, n_jobs = N_JOBS):
+	"""
+	Plota os clusters do modelo para cada par de atributos em paralelo.
+	'attrs' é a lista de (índice, nome) dos atributos. Retorna caminhos das figuras.
+	"""
+	columns, clusters, tick_labels = model_columns(model)
+	colors = [model.centroids[j]['color'] or "black" for j in range(model.k)]
+
+	pairs = list(combinations(attrs, 2))
+	with ProcessPoolExecutor(max_workers = n_jobs,
+									 initializer = init_worker,
+									 initargs = (columns, clusters, colors)) as executor:
+		futures = [executor.submit(render_pair, attr_x, attr_y, mode, tick_labels, output_dir)
+					  for attr_x, attr_y in pairs]
+		return [future.result() for future in futures]
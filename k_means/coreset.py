@@ -0,0 +1,92 @@
+"""
+Criado por: Marcelo Jantsch Wille
+Email: marcelojantschwille@gmail.com
+Última modificação: 19/10/2026
+Descrição: Construção de coresets para acelerar as várias execuções do k-means
+(reinícios aleatórios e varredura de 'k'). O coreset é uma amostra pequena e ponderada
+dos dados; o melhor modelo encontrado nele é refinado depois nos dados completos.
+"""
+
+# Módulos de Python
+from collections import Counter
+from random import choices
+from copy import deepcopy
+from math import inf
+import numpy as np
+
+# Módulos do projeto
+from k_means import K_means, batch_distances, CHUNK_SIZE
+
+
+def build_coreset(data, m, distance = "euclidian"):
+	"""
+	Constrói um coreset "leve" (Bachem, Lucic e Krause, 2018) com 'm' instâncias por amostragem
+	de sensibilidade. Cada instância x é sorteada com probabilidade
+
+		q(x) = 1/(2n) + d(x, μ)² / (2 Σ d(x', μ)²)
+
+	onde μ é o centro dos dados (média dos numéricos, moda dos categóricos), e recebe peso
+	1 / (m q(x)). Com m = O((d k log k + log 1/δ) / ε²), vale com probabilidade 1 - δ que, para
+	qualquer conjunto Q de 'k' centróides,
+
+		|custo_coreset(Q) - custo(Q)| <= ε/2 custo(Q) + ε/2 custo({μ})
+
+	Instâncias sorteadas mais de uma vez aparecem uma única vez no coreset, com a soma dos
+	pesos (evita centróides iniciais sobre o mesmo ponto). Retorna as instâncias sorteadas
+	(no formato original dos dados) e a lista de pesos.
+	"""
+
+	n = len(data)
+
+	# Modelo com k = 1 encontra o centro μ dos dados (e faz a codificação dos atributos)
+	center = K_means(1, deepcopy(data), distance)
+	center.run()
+	c_numeric, c_categorical = center.centroid_arrays()
+
+	# Distância ao quadrado de cada instância até o centro, calculada em blocos
+	squared_distances = np.empty(n)
+	for start in range(0, n, CHUNK_SIZE):
+		numeric, categorical = center.encode(data[start:start+CHUNK_SIZE])
+		distances = batch_distances(numeric, categorical, c_numeric, c_categorical, distance)
+		squared_distances[start:start+CHUNK_SIZE] = distances[:, 0] ** 2
+
+	# Distribuição de amostragem: metade uniforme, metade proporcional à distância ao centro
+	total = squared_distances.sum()
+	q = 0.5 / n + (0.5 * squared_distances / total if total > 0 else 0.5 / n)
+
+	# Número de vezes que cada instância foi sorteada (na ordem do primeiro sorteio)
+	draws = Counter(choices(range(n), weights=q.tolist(), k=m))
+	points = [data[i] for i in draws]
+	weights = [count / (m * q[i]) for i, count in draws.items()]
+
+	return points, weights
+
+
+
+def best_on_coreset(k, coreset, restarts, distance = "euclidian"):
+	"""
+	Roda o k-means 'restarts' vezes no coreset (devido à inicialização aleatória)
+	e retorna as posições dos centróides do modelo com menor distância intracluster.
+	"""
+	points, weights = coreset
+
+	lowest_wss = inf
+	lowest_positions = []
+
+	for _ in range(restarts):
+		model = K_means(k, deepcopy(points), distance, weights = weights)
+		model.run()
+		wss = model.get_wss()
+		if wss < lowest_wss:
+			lowest_wss = wss
+			lowest_positions = [centroid['position'] for centroid in model.centroids.values()]
+
+	return lowest_positions
+
+
+
+def refine(k, data, positions, distance = "euclidian"):
+	""" Refina nos dados completos uma solução encontrada no coreset, partindo de seus centróides. """
+	model = K_means(k, deepcopy(data), distance, centroids = positions)
+	model.run()
+	return model
@@ -1,7 +1,7 @@
 """
 Criado por: Marcelo Jantsch Wille
 Email: marcelojantschwille@gmail.com
-Última modificação: 04/11/2021
+Última modificação: 19/10/2026
 Descrição: Faz análise exploratória do dataset bank_t2,
 plotando clusters gerados na execução do k-means.
 """
@@ -9,11 +9,10 @@ plotando clusters gerados na execução do k-means.
 # Módulos de Python
 from csv import reader
 from copy import deepcopy
-from itertools import combinations
-import matplotlib.pyplot as plt
 
 # Módulos do projeto
 from k_means import K_means
+from cluster_plots import render_pairs
 
 # Arquivo com dados
 DATA_PATH  = "../data/bank_t2.csv"
@@ -21,6 +20,7 @@ DATA_PATH  = "../data/bank_t2.csv"
 # TODO substituir pelo 'k' ideal do 'find_best_k.py'
 K = 3     # Valor de 'K' com o qual o algoritmo K-means será executado
 I = 3     # Número de iterações para cálculo da menor distância intracluster de certo 'k'
+PLOT_MODE = "raster"   # "raster" (densidade) ou "sample" (subamostra estratificada por cluster)
 
 def get_lowest_wss_model(k, original_data):
 	"""
@@ -63,25 +63,5 @@ if __name__ == '__main__':
 	# Executa K-means
 	model = get_lowest_wss_model(K, data[1:])
 
-	# Plota clusters em gráficos 2D, casando atributo com atributo
-	for attr_x, attr_y in combinations(attrs, 2):
-		plt.figure()
-		xi = attr_x[0]
-		x_label = attr_x[1]
-		yi = attr_y[0]
-		y_label = attr_y[1]
-		# Pega clusters (com as instâncias) dos 2 atributos que serão plotados
-		for centroid in model.centroids.values():
-			color  = centroid['color']
-			data_x = []
-			data_y = []
-			for instance in centroid['instances']:
-				data_x.append(instance[xi])
-				data_y.append(instance[yi])
-			# Coloca pontos do cluster no gráfico
-			plt.scatter(data_x, data_y, color=color, marker='o')
-			plt.xlabel(x_label)
-			plt.ylabel(y_label)
-			plt.grid()
-		# Plota gráfico para os 2 atributos
-		plt.savefig(f"../img/analysis/{x_label}_{y_label}.png")
\ No newline at end of file
+	# Plota clusters em gráficos 2D, casando atributo com atributo (em paralelo)
+	render_pairs(model, attrs, PLOT_MODE, "../img/analysis")
\ No newline at end of file
@@ -1,7 +1,7 @@
 """
 Criado por: Marcelo Jantsch Wille
 Email: marcelojantschwille@gmail.com
-Última modificação: 03/11/2021
+Última modificação: 19/10/2026
 Descrição: Avaliação de qual o melhor 'k' para o algoritmo k-means.
 """
 
@@ -13,6 +13,7 @@ import matplotlib.pyplot as plt
 
 # Módulos do projeto
 from k_means import K_means
+from coreset import build_coreset, best_on_coreset, refine
 
 # Arquivo com dados
 DATA_PATH  = "./data/bank_t2.csv"
@@ -21,16 +22,23 @@ HAS_HEADER = True
 
 MAX_K = 20 # Valor máximo de 'k' para tentar encontrar o 'k' ideal
 I = 100    # Número de iterações para cálculo da menor distância intracluster de certo 'k'
+CORESET_SIZE = 1000   # Tamanho do coreset usado nas iterações (None para usar todos os dados)
 
 
-def get_lowest_wss(k, original_data):
+def get_lowest_wss(k, original_data, coreset = None):
 	"""
 	Devido à inicialização aleatória dos centróides, roda
 	o modelo um certo número de vezes para um determinado valor
 	de 'k'. Retorna a menor distância intracluster encontrada
-	dentre todas essas iterações com esse 'k'.
+	dentre todas essas iterações com esse 'k'. Se um coreset for
+	passado, as iterações rodam nele e a melhor solução é refinada
+	nos dados completos.
 	"""
 
+	if coreset:
+		positions = best_on_coreset(k, coreset, I)
+		return refine(k, original_data, positions).get_wss()
+
 	lowest_wss = inf
 
 	# Gera modelo 'i' vezes para o valor de 'k' e calcula distâncias intracluster
@@ -59,11 +67,14 @@ if __name__ == '__main__':
 
 	k_values = [k for k in range(1, MAX_K+1)]
 
+	# Coreset é construído uma única vez e reutilizado para todos os valores de 'k'
+	coreset = build_coreset(data, CORESET_SIZE) if CORESET_SIZE else None
+
 	# Roda k-means para diferentes valores de k
 	wss_values = []
 	for k in k_values:
 		# Para cada valor de 'k', roda várias vezes o algoritmo
-		wss = get_lowest_wss(k, data)
+		wss = get_lowest_wss(k, data, coreset)
 		wss_values.append(wss)
 		print(f"k={k} has wss={wss}")
 
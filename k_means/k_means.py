@@ -1,18 +1,23 @@
 """
 Criado por: Marcelo Jantsch Wille
 Email: marcelojantschwille@gmail.com
-Última modificação: 03/11/2021
+Última modificação: 19/10/2026
 Descrição: Implementação do algoritmo k-means.
 """
 
-from random import choice
+from random import choice, choices, sample
 from copy import deepcopy
 from math import inf, sqrt
-from statistics import mean, mode
+from statistics import mean, mode, fmean
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 
 
+# Número de instâncias processadas por vez na predição vetorizada
+CHUNK_SIZE = 8192
+
+
 def euclidian_distance(pt1, pt2, data_types):
 	"""
 	Calcula a distância euclidiana entre 2 pontos de dados. Nesta implementação,
@@ -81,12 +86,53 @@ def is_numeric(str_value):
 
 
 
+def get_distance(distance):
+	""" Função de distância pelo nome ("euclidian", "manhattan" ou "chebyshev") """
+	if distance == "euclidian":
+		return euclidian_distance
+	elif distance == "manhattan":
+		return manhattan_distance
+	elif distance == "chebyshev":
+		return chebyshev_distance
+	else:
+		raise Exception("Distância especificada para algoritmo K-means é inválida.")
+
+
+
+def batch_distances(numeric, categorical, c_numeric, c_categorical, distance):
+	"""
+	Versão vetorizada das distâncias acima. Recebe um bloco de instâncias já codificado
+	(matriz de atributos numéricos e matriz de códigos dos categóricos) e os centróides
+	codificados da mesma forma. Retorna matriz (instâncias x centróides) com as distâncias.
+	"""
+	# Diferenças de cada instância para cada centróide: (instâncias, centróides, atributos)
+	numeric_diff = np.abs(numeric[:, None, :] - c_numeric[None, :, :])
+	hamming = (categorical[:, None, :] != c_categorical[None, :, :]).astype(float)
+
+	if distance == "euclidian":
+		return np.sqrt((numeric_diff ** 2).sum(axis=2) + hamming.sum(axis=2))
+	elif distance == "manhattan":
+		return numeric_diff.sum(axis=2) + hamming.sum(axis=2)
+	elif distance == "chebyshev":
+		return np.concatenate([numeric_diff, hamming], axis=2).max(axis=2, initial=0)
+	else:
+		raise Exception("Distância especificada para algoritmo K-means é inválida.")
+
+
+
 class K_means:
 	""" Cria objetos capazes de rodar algoritmo k-means. """
 
-	def __init__(self, k, data, distance = "euclidian"):
+	def __init__(self, k, data, distance = "euclidian", weights = None, centroids = None, init = "random"):
+		"""
+		'weights' é uma lista opcional com o peso de cada instância (ex.: instâncias de um coreset).
+		'centroids' é uma lista opcional com as posições iniciais dos centróides, usada para refinar
+		uma solução já encontrada ao invés de inicializar os centróides aleatoriamente.
+		'init' é o método de inicialização dos centróides: "random" ou "kmeans++".
+		"""
 
 		self.k = k
+		self.weights = weights
 
 		colors = [
 			"darkgreen", "yellowgreen", "chartreuse",
@@ -97,14 +143,8 @@ class K_means:
 		]
 
 		# Inicializa distância se está entre as possíveis,  senão levanta exceção.
-		if distance == "euclidian":
-			self.distance = euclidian_distance
-		elif distance == "manhattan":
-			self.distance = manhattan_distance
-		elif distance == "chebyshev":
-			self.distance = chebyshev_distance
-		else:
-			raise Exception("Distância especificada para algoritmo K-means é inválida.")
+		self.distance_name = distance
+		self.distance = get_distance(distance)
 
 		# Toma os tipos (numérico ou categórico) de cada atributo
 		self.data_types = []
@@ -114,6 +154,16 @@ class K_means:
 			else:
 				self.data_types.append("categorical")
 
+		# Codificação dos valores de cada atributo categórico em inteiros (usada na predição vetorizada)
+		# {
+		#   índice do atributo: {'valor A': 0, 'valor B': 1, ...},
+		# }
+		self.encodings = {}
+		for i, data_type in enumerate(self.data_types):
+			if data_type == "categorical":
+				values = sorted(set(entry[i] for entry in data))
+				self.encodings[i] = {value: code for code, value in enumerate(values)}
+
 		# Pré-processamento dos dados: casting pra float de atributos numéricos
 		processed_data = []
 		for entry in data:
@@ -135,15 +185,25 @@ class K_means:
 			instance.append(-1)
 			self.data.append(instance)
 
+		# Sorteio dos centróides iniciais pelo k-means++ (se for o método escolhido)
+		if init == "kmeans++" and not centroids:
+			centroids = self.kmeans_plus_plus(data)
+		elif init not in ("random", "kmeans++"):
+			raise Exception("Inicialização especificada para algoritmo K-means é inválida.")
+
 		# Inicializa centróides de forma aleatória a partir dos dados,
 		# colocando os 'k' centróides em cima de 'k' pontos.
 		self.centroids = {}
 		for j in range(k):
-			instance = choice(data)
-			data.remove(instance)               # sem reposição
+			if centroids:
+				instance = list(centroids[j])
+			else:
+				instance = choice(data)
+				data.remove(instance)               # sem reposição
 			self.centroids[j] = {}
 			self.centroids[j]['position']  = instance
 			self.centroids[j]['instances'] = []
+			self.centroids[j]['weights']   = []
 
 			# Pode gerar cores para cada cluster somente se número de cores disponíveis menor que 'k'
 			if k <= len(colors):
@@ -154,8 +214,35 @@ class K_means:
 				self.centroids[j]['color'] = None
 
 
-	def run(self, show_plots = False):
-		""" Executa o algoritmo, implementando o loop principal do k-means. """
+	def kmeans_plus_plus(self, data):
+		"""
+		Inicialização k-means++: primeiro centróide sorteado uniformemente, os seguintes
+		sorteados com probabilidade proporcional ao quadrado da distância (ponderada pelo
+		peso da instância) até o centróide já escolhido mais próximo.
+		"""
+		numeric, categorical = self.encode(data)
+		weights = np.asarray(self.weights or [1] * len(data), dtype=float)
+
+		chosen = [choice(range(len(data)))]
+		min_distances = np.full(len(data), inf)
+		for _ in range(self.k - 1):
+			c = chosen[-1]
+			distances = batch_distances(numeric, categorical, numeric[c:c+1], categorical[c:c+1], self.distance_name)
+			min_distances = np.minimum(min_distances, distances[:, 0] ** 2)
+			probabilities = weights * min_distances
+			# Todas as instâncias em cima de centróides já escolhidos: sorteio uniforme
+			if probabilities.sum() == 0:
+				probabilities = weights
+			chosen.append(choices(range(len(data)), weights=probabilities.tolist())[0])
+
+		return [data[i] for i in chosen]
+
+
+	def run(self, show_plots = False, max_points = None):
+		"""
+		Executa o algoritmo, implementando o loop principal do k-means.
+		'max_points' limita o número de pontos plotados por cluster em cada iteração.
+		"""
 
 		instance_cluster_changed = True
 		i = 1
@@ -170,9 +257,11 @@ class K_means:
 
 			# Para cada instância, encontra centróide mais próximo
 			# instance[-1] é o centróide mais próximo da instância no último loop
-			for instance in self.data:
+			weights = self.weights or [1] * len(self.data)
+			for instance, weight in zip(self.data, weights):
 				closest_centroid = self.find_closest_centroid(instance)
 				self.centroids[closest_centroid]['instances'].append(instance)
+				self.centroids[closest_centroid]['weights'].append(weight)
 				# Caso centróide mais próximo mudou, atualiza valor
 				if closest_centroid != instance[-1]:
 					instance[-1] = closest_centroid
@@ -184,7 +273,7 @@ class K_means:
 
 			# Plota gráfico com clusters formados nessa iteração (caso clusters tenham mudado)
 			if show_plots and instance_cluster_changed:
-				self.plot_clusters(i)
+				self.plot_clusters(i, max_points)
 
 			i += 1
 
@@ -213,12 +302,25 @@ class K_means:
 	def update_centroid_position(self, j, centroid):
 		""" Calcula nova posição do centróide com base em suas instâncias. """
 
+		# Centróide sem instâncias permanece onde está
+		if not centroid['instances']:
+			return
+
 		new_position = []
 
 		for i in range(len(self.data_types)):
 			# Faz a média dos valores de cada atributo para ser essa a nova posição do centróide
 			values = [attr[i] for attr in centroid['instances']]
-			if self.data_types[i] == "numeric":
+			# Com pesos, usa média ponderada e moda ponderada (valor com maior soma de pesos)
+			if self.weights:
+				if self.data_types[i] == "numeric":
+					attr_avg = fmean(values, centroid['weights'])
+				else:
+					value_weights = {}
+					for value, weight in zip(values, centroid['weights']):
+						value_weights[value] = value_weights.get(value, 0) + weight
+					attr_avg = max(value_weights, key=value_weights.get)
+			elif self.data_types[i] == "numeric":
 				attr_avg = mean(values)
 			else:
 				attr_avg = mode(values)
@@ -234,6 +336,7 @@ class K_means:
 		"""
 		for j in self.centroids.keys():
 			self.centroids[j]['instances'] = []
+			self.centroids[j]['weights'] = []
 
 
 	def get_wss(self):
@@ -244,15 +347,132 @@ class K_means:
 		# Calcula distâncias intracluster de cada grupo (ie. para cada centróide e suas instâncias)
 		for centroid in self.centroids.values():
 			distance = 0
-			for instance in centroid['instances']:
-				distance += self.distance(instance, centroid['position'], self.data_types) ** 2
+			for instance, weight in zip(centroid['instances'], centroid['weights']):
+				distance += weight * self.distance(instance, centroid['position'], self.data_types) ** 2
 			centroid_distances.append(distance)
 
 		return sum(centroid_distances)   # Soma todas as distâncias intracluster
 
 
-	def plot_clusters(self, i = 0):
-		""" Plota gráfico com clusters formados. """
+	def encode(self, batch):
+		"""
+		Codifica instâncias (lista de listas ou matriz) em duas matrizes: uma com os atributos
+		numéricos convertidos para float e outra com os códigos dos atributos categóricos.
+		Valores categóricos não vistos no treino recebem código -1 (sempre diferentes do centróide).
+		"""
+		numeric_i = [i for i, t in enumerate(self.data_types) if t == "numeric"]
+		categorical_i = [i for i, t in enumerate(self.data_types) if t == "categorical"]
+
+		batch = np.asarray(batch, dtype=object)
+		if batch.ndim == 1:
+			batch = batch.reshape(1, -1)
+
+		numeric = batch[:, numeric_i].astype(float)
+		categorical = np.empty((len(batch), len(categorical_i)), dtype=np.int32)
+		for j, i in enumerate(categorical_i):
+			codes = self.encodings[i]
+			categorical[:, j] = [codes.get(value, -1) for value in batch[:, i]]
+
+		return numeric, categorical
+
+
+	def centroid_arrays(self):
+		""" Retorna posições dos centróides codificadas (mesmo formato de 'encode'). """
+		positions = [self.centroids[j]['position'] for j in range(self.k)]
+		return self.encode(positions)
+
+
+	def assign(self, numeric, categorical, c_numeric, c_categorical):
+		""" Retorna índice do centróide mais próximo de cada instância de um bloco já codificado. """
+		distances = batch_distances(numeric, categorical, c_numeric, c_categorical, self.distance_name)
+		return distances.argmin(axis=1)
+
+
+	def predict(self, batch, chunk_size = CHUNK_SIZE):
+		"""
+		Associa novas instâncias ao centróide mais próximo sem retreinar o modelo.
+		As instâncias são processadas em blocos de 'chunk_size' para limitar o uso de memória.
+		Retorna vetor com o índice do centróide de cada instância.
+		"""
+		c_numeric, c_categorical = self.centroid_arrays()
+
+		clusters = np.empty(len(batch), dtype=np.int32)
+		for start in range(0, len(batch), chunk_size):
+			numeric, categorical = self.encode(batch[start:start+chunk_size])
+			clusters[start:start+chunk_size] = self.assign(numeric, categorical, c_numeric, c_categorical)
+
+		return clusters
+
+
+	def save(self, path):
+		"""
+		Salva o modelo em formato binário (npz): centróides, codificações dos
+		atributos categóricos, tipos dos dados, distância e cores dos clusters.
+		O arquivo é escrito exatamente em 'path' (sem acrescentar a extensão '.npz').
+		"""
+		c_numeric, c_categorical = self.centroid_arrays()
+
+		encodings = {}
+		for i, codes in self.encodings.items():
+			encodings[f"encoding_{i}"] = np.array(sorted(codes, key=codes.get), dtype=str)
+
+		colors = [self.centroids[j]['color'] or "" for j in range(self.k)]
+
+		with open(path, 'wb') as fp:
+			np.savez(fp,
+						k = np.array(self.k),
+						distance = np.array(self.distance_name),
+						data_types = np.array(self.data_types, dtype=str),
+						c_numeric = c_numeric,
+						c_categorical = c_categorical,
+						colors = np.array(colors, dtype=str),
+						**encodings)
+
+
+	@classmethod
+	def load(cls, path):
+		""" Carrega modelo salvo com 'save', pronto para 'predict' (sem dados de treino). """
+		with np.load(path, allow_pickle=False) as fp:
+			model = cls.__new__(cls)
+			model.k = int(fp['k'])
+			model.distance_name = str(fp['distance'])
+			model.distance = get_distance(model.distance_name)
+			model.data_types = [str(t) for t in fp['data_types']]
+			model.encodings = {}
+			for i, data_type in enumerate(model.data_types):
+				if data_type == "categorical":
+					values = [str(v) for v in fp[f"encoding_{i}"]]
+					model.encodings[i] = {value: code for code, value in enumerate(values)}
+
+			# Reconstrói posição de cada centróide decodificando os atributos categóricos
+			model.data = []
+			model.weights = None
+			model.centroids = {}
+			for j in range(model.k):
+				numeric = iter(fp['c_numeric'][j].tolist())
+				categorical = iter(fp['c_categorical'][j].tolist())
+				position = []
+				for i, data_type in enumerate(model.data_types):
+					if data_type == "numeric":
+						position.append(next(numeric))
+					else:
+						values = list(model.encodings[i])
+						position.append(values[next(categorical)])
+				model.centroids[j] = {
+					'position': position,
+					'instances': [],
+					'weights': [],
+					'color': str(fp['colors'][j]) or None,
+				}
+
+		return model
+
+
+	def plot_clusters(self, i = 0, max_points = None):
+		"""
+		Plota gráfico com clusters formados. Se 'max_points' for passado, plota
+		somente uma subamostra de no máximo 'max_points' instâncias de cada cluster.
+		"""
 
 		# Não pode gerar plot se 'k' for maior que número de cores disponíveis
 		if not self.centroids[0]['color']:
@@ -262,14 +482,18 @@ class K_means:
 
 		# Gera pontos para cada cluster (assume dados 2D, pegando sempre os 2 primeiros valores)
 		for centroid in self.centroids.values():
+			instances = centroid['instances']
+			if max_points and len(instances) > max_points:
+				instances = sample(instances, max_points)
+
 			cluster_x = []
 			cluster_y = []
-			for instance in centroid['instances']:
+			for instance in instances:
 				cluster_x.append(instance[0])
 				cluster_y.append(instance[1])
 
 			# Plota pontos das instâncias
-			plt.scatter(cluster_x, cluster_y, color = centroid['color'], marker = 'o', s =.2)
+			plt.scatter(cluster_x, cluster_y, color = centroid['color'], marker = 'o', s =.2, rasterized = True)
 
 		plt.grid()
 
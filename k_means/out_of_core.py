@@ -0,0 +1,285 @@
+"""
+Criado por: Marcelo Jantsch Wille
+Email: marcelojantschwille@gmail.com
+Última modificação: 19/10/2026
+Descrição: K-means fora da memória (out-of-core). O CSV é convertido uma única vez
+em arquivos binários por coluna, que são mapeados em memória e percorridos em blocos
+de tamanho fixo a cada iteração de Lloyd. O pico de memória depende do tamanho do bloco,
+e não do número de instâncias.
+"""
+
+# Módulos de Python
+from csv import reader
+from itertools import islice
+from random import sample
+from tempfile import TemporaryFile
+import json
+import os
+import numpy as np
+
+# Módulos do projeto
+from k_means import K_means, is_numeric, get_distance
+
+# Arquivo com dados
+DATA_PATH = "../data/benchmark_instances.csv"
+# Booleano que indica se arquivo possui cabeçalho
+HAS_HEADER = False
+# Pasta onde ficam os arquivos binários de cada coluna
+COLUMNS_DIR = "../data/benchmark_instances_columns"
+
+K = 15               # Valor de 'K' com o qual o algoritmo K-means será executado
+BLOCK_SIZE = 65536   # Número de instâncias lidas por vez dos arquivos de colunas
+
+META_FILE   = "meta.json"      # Metadados: número de instâncias, tipos e codificações
+LABELS_FILE = "labels.int32"   # Índice do centróide de cada instância (atualizado a cada iteração)
+
+
+def convert_csv(csv_path, columns_dir, has_header = False, block_size = BLOCK_SIZE):
+	"""
+	Converte o CSV em um arquivo binário por coluna (float64 para atributos numéricos,
+	int32 com o código do valor para categóricos), lendo o CSV em blocos numa única passada.
+	"""
+	os.makedirs(columns_dir, exist_ok=True)
+
+	with open(csv_path, 'r') as fp:
+		csv_reader = reader(fp, delimiter=',')
+		if has_header:
+			next(csv_reader)
+
+		data_types = None
+		encodings = []
+		files = []
+		n_rows = 0
+
+		while True:
+			block = list(islice(csv_reader, block_size))
+			if not block:
+				break
+
+			# Tipos de cada atributo são definidos pela primeira instância (como no K_means)
+			if data_types is None:
+				data_types = ["numeric" if is_numeric(v) else "categorical" for v in block[0]]
+				encodings = [{} for _ in data_types]
+				files = [open(os.path.join(columns_dir, f"{i}.bin"), 'wb') for i in range(len(data_types))]
+
+			for i, data_type in enumerate(data_types):
+				values = [entry[i] for entry in block]
+				if data_type == "numeric":
+					np.array(values, dtype=np.float64).tofile(files[i])
+				else:
+					codes = encodings[i]
+					column = [codes.setdefault(value, len(codes)) for value in values]
+					np.array(column, dtype=np.int32).tofile(files[i])
+
+			n_rows += len(block)
+
+	for f in files:
+		f.close()
+
+	meta = {
+		'n_rows': n_rows,
+		'data_types': data_types,
+		'encodings': {i: list(codes) for i, codes in enumerate(encodings) if codes},
+	}
+	with open(os.path.join(columns_dir, META_FILE), 'w') as fp:
+		json.dump(meta, fp)
+
+	return columns_dir
+
+
+
+class ColumnStore:
+	""" Acesso às colunas binárias geradas por 'convert_csv' através de memory-map. """
+
+	def __init__(self, columns_dir):
+		with open(os.path.join(columns_dir, META_FILE), 'r') as fp:
+			meta = json.load(fp)
+
+		self.columns_dir = columns_dir
+		self.n_rows = meta['n_rows']
+		self.data_types = meta['data_types']
+
+		# Codificação {valor: código} de cada atributo categórico (mesmo formato do K_means)
+		self.encodings = {}
+		for i, values in meta['encodings'].items():
+			self.encodings[int(i)] = {value: code for code, value in enumerate(values)}
+
+		self.numeric = []
+		self.categorical = []
+		for i, data_type in enumerate(self.data_types):
+			path = os.path.join(columns_dir, f"{i}.bin")
+			if data_type == "numeric":
+				self.numeric.append(np.memmap(path, dtype=np.float64, mode='r', shape=(self.n_rows,)))
+			else:
+				self.categorical.append(np.memmap(path, dtype=np.int32, mode='r', shape=(self.n_rows,)))
+
+
+	def block(self, start, end):
+		""" Lê bloco de instâncias [start, end) já codificado (matriz numérica e matriz categórica). """
+		numeric = np.empty((end - start, len(self.numeric)), dtype=np.float64)
+		for j, column in enumerate(self.numeric):
+			numeric[:, j] = column[start:end]
+
+		categorical = np.empty((end - start, len(self.categorical)), dtype=np.int32)
+		for j, column in enumerate(self.categorical):
+			categorical[:, j] = column[start:end]
+
+		return numeric, categorical
+
+
+	def row(self, i):
+		""" Reconstrói a instância 'i' com os valores originais dos atributos categóricos. """
+		numeric, categorical = self.block(i, i+1)
+		numeric = iter(numeric[0].tolist())
+		categorical = iter(categorical[0].tolist())
+
+		entry = []
+		for j, data_type in enumerate(self.data_types):
+			if data_type == "numeric":
+				entry.append(next(numeric))
+			else:
+				entry.append(list(self.encodings[j])[next(categorical)])
+		return entry
+
+
+
+class OutOfCoreK_means(K_means):
+	"""
+	K-means sobre colunas mapeadas em memória. Cada iteração percorre os dados em blocos,
+	acumulando somas e contagens por centróide. As instâncias não ficam guardadas nos
+	centróides, então os métodos de plot do K_means não estão disponíveis neste modo. Com
+	'labels_path', o índice do centróide de cada instância fica salvo nesse arquivo.
+	"""
+
+	def __init__(self, k, columns_dir, distance = "euclidian", block_size = BLOCK_SIZE, labels_path = None):
+
+		self.k = k
+		self.block_size = block_size
+		self.store = ColumnStore(columns_dir)
+		self.data = []
+		self.weights = None
+
+		# Inicializa distância se está entre as possíveis,  senão levanta exceção.
+		self.distance_name = distance
+		self.distance = get_distance(distance)
+
+		self.data_types = self.store.data_types
+		self.encodings = self.store.encodings
+
+		# Índice do centróide de cada instância fica em disco, também mapeado em memória. Sem
+		# 'labels_path', cada modelo usa um arquivo temporário próprio na pasta das colunas
+		# (apagado ao ser fechado), então modelos sobre os mesmos dados não se sobrescrevem
+		labels_file = open(labels_path, 'w+b') if labels_path else TemporaryFile(dir=columns_dir)
+		with labels_file:
+			self.labels = np.memmap(labels_file, dtype=np.int32, mode='w+', shape=(self.store.n_rows,))
+		self.labels[:] = -1
+
+		# Inicializa centróides em cima de 'k' instâncias distintas sorteadas
+		self.centroids = {}
+		for j, i in enumerate(sample(range(self.store.n_rows), k)):
+			self.centroids[j] = {'position': self.store.row(i), 'instances': [], 'color': None}
+
+
+	def blocks(self):
+		""" Percorre os dados em blocos de 'block_size' instâncias. """
+		for start in range(0, self.store.n_rows, self.block_size):
+			end = min(start + self.block_size, self.store.n_rows)
+			yield start, end, self.store.block(start, end)
+
+
+	def run(self, show_plots = False):
+		""" Executa o loop principal do k-means em blocos, acumulando somas e contagens. """
+
+		if show_plots:
+			raise Exception("Plot não é possível no modo out-of-core.")
+
+		numeric_i = [i for i, t in enumerate(self.data_types) if t == "numeric"]
+		categorical_i = [i for i, t in enumerate(self.data_types) if t == "categorical"]
+
+		instance_cluster_changed = True
+
+		# Enquanto houver alteração nas associações de instâncias aos seus clusters
+		while instance_cluster_changed:
+			instance_cluster_changed = False
+
+			c_numeric, c_categorical = self.centroid_arrays()
+
+			# Acumuladores: soma dos numéricos e contagem de cada valor categórico por centróide
+			counts = np.zeros(self.k)
+			sums = np.zeros((self.k, len(numeric_i)))
+			value_counts = [np.zeros((self.k, len(self.encodings[i])), dtype=np.int64) for i in categorical_i]
+
+			for start, end, (numeric, categorical) in self.blocks():
+				clusters = self.assign(numeric, categorical, c_numeric, c_categorical)
+
+				# Caso centróide mais próximo mudou para alguma instância, atualiza valores
+				if (self.labels[start:end] != clusters).any():
+					self.labels[start:end] = clusters
+					instance_cluster_changed = True
+
+				counts += np.bincount(clusters, minlength=self.k)
+				for j in range(len(numeric_i)):
+					sums[:, j] += np.bincount(clusters, weights=numeric[:, j], minlength=self.k)
+				for j, value_count in enumerate(value_counts):
+					n_values = value_count.shape[1]
+					keys = clusters * n_values + categorical[:, j]
+					value_counts[j] += np.bincount(keys, minlength=self.k * n_values).reshape(self.k, n_values)
+
+			# Pra cada centróide, corrige sua posição com base nas novas associações
+			for j, centroid in self.centroids.items():
+				# Centróide sem instâncias permanece onde está
+				if counts[j] == 0:
+					continue
+				numeric = iter((sums[j] / counts[j]).tolist())
+				modes = iter([int(c[j].argmax()) for c in value_counts])
+				new_position = []
+				for i, data_type in enumerate(self.data_types):
+					if data_type == "numeric":
+						new_position.append(next(numeric))
+					else:
+						new_position.append(list(self.encodings[i])[next(modes)])
+				centroid['position'] = new_position
+
+		self.labels.flush()
+
+
+	def get_wss(self):
+		""" Calcula a dissimilaridade intracluster percorrendo os dados em blocos. """
+		c_numeric, c_categorical = self.centroid_arrays()
+
+		wss = 0
+		for start, end, (numeric, categorical) in self.blocks():
+			clusters = np.asarray(self.labels[start:end])
+			numeric = numeric - c_numeric[clusters]
+			mismatches = categorical != c_categorical[clusters]
+			wss += self.block_wss(numeric, mismatches)
+
+		return wss
+
+
+	def block_wss(self, numeric_diff, mismatches):
+		""" Soma das distâncias ao quadrado de um bloco para seus centróides. """
+		numeric_diff = np.abs(numeric_diff)
+		if self.distance_name == "euclidian":
+			return float(((numeric_diff ** 2).sum() + mismatches.sum()))
+		elif self.distance_name == "manhattan":
+			return float(((numeric_diff.sum(axis=1) + mismatches.sum(axis=1)) ** 2).sum())
+		else:
+			distances = np.concatenate([numeric_diff, mismatches.astype(float)], axis=1).max(axis=1, initial=0)
+			return float((distances ** 2).sum())
+
+
+
+if __name__ == '__main__':
+	# Converte o CSV em colunas binárias somente se ainda não foi convertido
+	if not os.path.exists(os.path.join(COLUMNS_DIR, META_FILE)):
+		convert_csv(DATA_PATH, COLUMNS_DIR, HAS_HEADER)
+
+	model = OutOfCoreK_means(K, COLUMNS_DIR, labels_path = os.path.join(COLUMNS_DIR, LABELS_FILE))
+	model.run()
+
+	# Imprime centróides
+	print("Centróides:")
+	for centroid in model.centroids.values():
+		print(centroid['position'])
+	print(f"WSS = {model.get_wss()}")
@@ -0,0 +1,339 @@
+"""
+Criado por: Marcelo Jantsch Wille
+Email: marcelojantschwille@gmail.com
+Última modificação: 19/10/2026
+Descrição: Compactação de árvores e florestas treinadas: nodos cujos filhos são folhas
+com a mesma classe viram folha, subárvores idênticas (em todas as árvores da floresta) são
+guardadas uma única vez e, opcionalmente, a poda por redução de erro usa as instâncias
+'Out of Bag' de cada árvore. As árvores da floresta compactada compartilham os vetores de
+nodos, cada uma com a sua raíz. Executado diretamente, compara tamanho, predições e tempo
+de classificação antes e depois da compactação nos datasets do projeto.
+"""
+
+# Módulos de Python
+from csv import reader
+from time import perf_counter
+import numpy as np
+
+# Módulos próprios do projeto
+from tree import DecisionTree, Ensemble, MODEL_ARRAYS
+
+
+# Datasets usados na comparação
+DATA_PATHS = ["../data/house_votes_84.csv", "../data/wine_recognition.csv", "../data/benchmark.csv"]
+NTREE = 50       # Número de árvores das florestas compactadas
+
+
+def compact(model, prune = False):
+	"""
+	Compacta árvore ('DecisionTree') ou floresta ('Ensemble') treinada. Com 'prune', as
+	árvores são antes podadas com as suas instâncias 'Out of Bag' (precisa dos dados de
+	treino). Sem poda, as predições não mudam. Retorna número de nodos guardados antes e depois.
+	"""
+	if isinstance(model, Ensemble):
+		decision_trees = model.decision_trees
+	elif isinstance(model, DecisionTree):
+		decision_trees = [model]
+	else:
+		raise TypeError(f"Cannot compact object of type {type(model).__name__}.")
+
+	if prune:
+		dataset = decision_trees[0].dataset
+		if dataset is None or dataset.columns is None or any(decision_tree.boot_test_set is None
+																			  for decision_tree in decision_trees):
+			raise ValueError("Pruning needs the training data and the 'Out of Bag' instances of each tree.")
+		matrix = np.column_stack(dataset.columns[:-1])
+
+	before = stored_nodes(decision_trees)
+
+	# As árvores são alteradas em cópias dos vetores. Vetores compartilhados (floresta já
+	# compactada ou carregada) são copiados uma única vez e cada árvore parte da sua raíz, pois
+	# juntar folhas não muda as predições de nenhuma árvore. A poda depende das instâncias de
+	# cada árvore, então cada uma poda a sua cópia somente dos nodos alcançáveis pela raíz
+	copies = {}   # Endereço dos vetores de nodos -> cópia
+	trees_arrays = []
+	trees_roots = []
+	for decision_tree in decision_trees:
+		if prune:
+			arrays, root = reachable_arrays(decision_tree)
+			prune_tree(decision_tree, arrays, root, matrix, dataset.target)
+		else:
+			address = decision_tree.feature.__array_interface__['data'][0]
+			if address not in copies:
+				copies[address] = {name: np.array(getattr(decision_tree, name)) for name in MODEL_ARRAYS}
+			arrays, root = copies[address], decision_tree.root
+		merge_leaves(decision_tree, arrays, root)
+		trees_arrays.append(arrays)
+		trees_roots.append(root)
+
+	pool, roots = hash_cons(decision_trees, trees_arrays, trees_roots)
+	for decision_tree, root in zip(decision_trees, roots):
+		for name, array in pool.items():
+			setattr(decision_tree, name, array)
+		decision_tree.root = root
+
+	# Predições guardadas no cache da floresta deixam de valer
+	if isinstance(model, Ensemble):
+		model.version += 1
+
+	return before, stored_nodes(decision_trees)
+
+
+
+def stored_nodes(decision_trees):
+	""" Número de nodos guardados pelas árvores (vetores compartilhados contam uma única vez) """
+	pools = {decision_tree.feature.__array_interface__['data'][0]: len(decision_tree.feature)
+				for decision_tree in decision_trees}
+	return sum(pools.values())
+
+
+
+def reachable_arrays(decision_tree):
+	"""
+	Cópia dos vetores de nodos da árvore somente com os nodos alcançáveis a partir da raíz
+	(vetores compartilhados com outras árvores não são copiados inteiros). Retorna os
+	vetores e a raíz neles.
+	"""
+	shared = {name: getattr(decision_tree, name) for name in MODEL_ARRAYS}
+	nodes = post_order(decision_tree, shared, decision_tree.root)
+	new_index = {node: i for i, node in enumerate(nodes)}
+
+	arrays = {name: shared[name][nodes] for name in ('feature', 'threshold', 'value', 'info_gain')}
+	arrays['child_start'] = np.full(len(nodes), -1, dtype=shared['child_start'].dtype)
+	children = []
+	for i, node in enumerate(nodes):
+		if arrays['feature'][i] != -1:
+			arrays['child_start'][i] = len(children)
+			children.extend(new_index[son] if son != -1 else -1 for son in node_sons(decision_tree, shared, node))
+	arrays['children'] = np.array(children, dtype=shared['children'].dtype)
+
+	return arrays, new_index[decision_tree.root]
+
+
+
+def node_sons(decision_tree, arrays, node):
+	""" Filhos de um nodo, um por ramo ([menor_igual, maior] ou um por código; -1 se sem filho) """
+	attr = decision_tree.headers[arrays['feature'][node]]
+	n_branches = 2 if decision_tree.attr_info[attr]['is_numeric'] else len(decision_tree.attr_info[attr]['values'])
+	start = arrays['child_start'][node]
+	return arrays['children'][start:start + n_branches].tolist()
+
+
+
+def post_order(decision_tree, arrays, root):
+	""" Nodos alcançáveis a partir de 'root', cada um depois de todos os seus filhos (sem recursão) """
+	order = []
+	visited = set()
+	stack = [(root, False)]
+	while stack:
+		node, expanded = stack.pop()
+		if expanded:
+			order.append(node)
+			continue
+
+		# Nodo compartilhado (alcançável por mais de um caminho) é visitado uma única vez
+		if node in visited:
+			continue
+		visited.add(node)
+		if arrays['feature'][node] == -1:
+			order.append(node)
+			continue
+
+		stack.append((node, True))
+		for son in node_sons(decision_tree, arrays, node):
+			if son != -1 and son not in visited:
+				stack.append((son, False))
+	return order
+
+
+
+def make_leaf(arrays, node, value):
+	""" Transforma o nodo em folha com a classe 'value' (os filhos deixam de ser alcançáveis) """
+	arrays['feature'][node] = -1
+	arrays['threshold'][node] = np.nan
+	arrays['child_start'][node] = -1
+	arrays['value'][node] = value
+	arrays['info_gain'][node] = 0.0
+
+
+
+def merge_leaves(decision_tree, arrays, root):
+	"""
+	Nodos cujos ramos levam todos à mesma classe viram folha dessa classe, de baixo para
+	cima. Em nodo categórico, valores sem filho ou desconhecidos levam à predição padrão do
+	nodo, que também precisa ser igual. Nodo numérico com os dois ramos no mesmo filho é
+	substituído pelo filho. As predições da árvore não mudam.
+	"""
+	feature, value = arrays['feature'], arrays['value']
+
+	for node in post_order(decision_tree, arrays, root):
+		if feature[node] == -1:
+			continue
+
+		sons = node_sons(decision_tree, arrays, node)
+		if decision_tree.attr_info[decision_tree.headers[feature[node]]]['is_numeric'] and sons[0] == sons[1]:
+			for name in ('feature', 'threshold', 'child_start', 'value', 'info_gain'):
+				arrays[name][node] = arrays[name][sons[0]]
+			continue
+		if any(son != -1 and feature[son] != -1 for son in sons):
+			continue
+
+		outcomes = {int(value[son]) for son in sons if son != -1}
+		if not decision_tree.attr_info[decision_tree.headers[feature[node]]]['is_numeric']:
+			outcomes.add(int(value[node]))
+		if len(outcomes) == 1:
+			make_leaf(arrays, node, outcomes.pop())
+
+
+
+def route_counts(decision_tree, arrays, root, matrix, targets):
+	"""
+	Passa as instâncias codificadas pela árvore a partir da raíz 'root' (como 'predict_codes').
+	Retorna, para cada nodo, a contagem de cada classe das instâncias que passaram por ele e
+	das que pararam nele.
+	"""
+	n_nodes, n_classes = len(arrays['feature']), len(decision_tree.classes)
+	feature = arrays['feature'].astype(np.intp)
+	child_start = arrays['child_start'].astype(np.intp)
+	children = np.append(arrays['children'].astype(np.intp), -1)   # Última posição: sem filho
+	is_numeric = np.array([decision_tree.attr_info[header]['is_numeric'] for header in decision_tree.headers[:-1]])
+
+	passing = np.zeros(n_nodes * n_classes, dtype=np.int64)
+	stops = np.zeros(n_nodes * n_classes, dtype=np.int64)
+	nodes = np.full(len(matrix), root, dtype=np.intp)
+	active = np.arange(len(matrix))
+
+	while len(active):
+		current = nodes[active]
+		passing += np.bincount(current * n_classes + targets[active], minlength=len(passing))
+
+		# Folhas e valores categóricos sem filho (ou desconhecidos) param a instância no nodo
+		attr_i = feature[current]
+		inner = attr_i != -1
+		attr_values = matrix[active, np.maximum(attr_i, 0)]
+		branch = np.where(is_numeric[np.maximum(attr_i, 0)], ~(attr_values <= arrays['threshold'][current]),
+								attr_values).astype(np.intp)
+		sons = children[np.where(inner & (branch >= 0), child_start[current] + branch, -1)]
+		moved = sons != -1
+
+		stops += np.bincount(current[~moved] * n_classes + targets[active[~moved]], minlength=len(stops))
+		nodes[active[moved]] = sons[moved]
+		active = active[moved]
+
+	return passing.reshape(n_nodes, n_classes), stops.reshape(n_nodes, n_classes)
+
+
+
+def prune_tree(decision_tree, arrays, root, matrix, targets):
+	"""
+	Poda por redução de erro, de baixo para cima: um nodo vira folha se os erros nas suas
+	instâncias 'Out of Bag' não aumentam. A classe da folha é a majoritária das instâncias
+	de treino (as sorteadas no bootstrap, sem peso) que passam pelo nodo.
+	"""
+	oob = decision_tree.boot_test_set
+	in_bag = np.setdiff1d(np.arange(len(matrix)), oob)
+	oob_passing, oob_stops = route_counts(decision_tree, arrays, root, matrix[oob], targets[oob])
+	train_passing, _ = route_counts(decision_tree, arrays, root, matrix[in_bag], targets[in_bag])
+
+	feature, value = arrays['feature'], arrays['value']
+	errors = {}   # Erros 'Out of Bag' da subárvore (já podada) de cada nodo
+	for node in post_order(decision_tree, arrays, root):
+		if feature[node] == -1:
+			errors[node] = oob_passing[node].sum() - oob_passing[node][value[node]]
+			continue
+
+		# Erros dos filhos e das instâncias que param no nodo (predição padrão)
+		sons = {son for son in node_sons(decision_tree, arrays, node) if son != -1}
+		subtree_errors = oob_stops[node].sum() - oob_stops[node][value[node]] + sum(errors[son] for son in sons)
+
+		label = int(train_passing[node].argmax()) if train_passing[node].any() else int(value[node])
+		leaf_errors = oob_passing[node].sum() - oob_passing[node][label]
+		if leaf_errors <= subtree_errors:
+			make_leaf(arrays, node, label)
+			errors[node] = leaf_errors
+		else:
+			errors[node] = subtree_errors
+
+
+
+def hash_cons(decision_trees, trees_arrays, trees_roots):
+	"""
+	Guarda cada subárvore distinta uma única vez: nodos com o mesmo teste (atributo e
+	limiar), mesma predição padrão e mesmos filhos (já únicos) são o mesmo nodo, em todas as
+	árvores. O ganho de informação guardado é o do primeiro nodo encontrado. Nodo numérico cujos
+	dois filhos viram o mesmo nodo é substituído por ele. Retorna os vetores de nodos
+	compartilhados e a raíz de cada árvore neles ('trees_roots' são as raízes nos vetores de
+	'trees_arrays').
+	"""
+	pool = {name: [] for name in MODEL_ARRAYS}
+	ids = {}     # Chave do nodo -> posição nos vetores compartilhados
+	roots = []
+
+	for decision_tree, arrays, root in zip(decision_trees, trees_arrays, trees_roots):
+		new_index = {}   # Nodo da árvore -> posição nos vetores compartilhados
+		for node in post_order(decision_tree, arrays, root):
+			if arrays['feature'][node] == -1:
+				sons = []
+				key = (-1, int(arrays['value'][node]))
+			else:
+				sons = [new_index[son] if son != -1 else -1 for son in node_sons(decision_tree, arrays, node)]
+				threshold = arrays['threshold'][node]
+				key = (int(arrays['feature'][node]), None if np.isnan(threshold) else float(threshold),
+						 int(arrays['value'][node]), tuple(sons))
+
+				# Os dois ramos levam à mesma subárvore: o teste é desnecessário
+				if key[1] is not None and sons[0] == sons[1]:
+					new_index[node] = sons[0]
+					continue
+
+			if key not in ids:
+				ids[key] = len(pool['feature'])
+				pool['feature'].append(arrays['feature'][node])
+				pool['threshold'].append(arrays['threshold'][node])
+				pool['child_start'].append(len(pool['children']) if sons else -1)
+				pool['value'].append(arrays['value'][node])
+				pool['info_gain'].append(arrays['info_gain'][node])
+				pool['children'].extend(sons)
+			new_index[node] = ids[key]
+
+		roots.append(new_index[root])
+
+	return {name: np.array(values, dtype=MODEL_ARRAYS[name]) for name, values in pool.items()}, roots
+
+
+
+if __name__ == '__main__':
+
+	for data_path in DATA_PATHS:
+
+		data = []
+
+		# Abre e lê dados do arquivo com o dataset
+		with open(data_path, 'r') as fp:
+			csv_reader = reader(fp, delimiter=',')
+			for line in csv_reader:
+				data.append(line)
+
+		rows = data[1:]
+		print(f"{data_path} ({NTREE} árvores)")
+
+		for label, prune in [("compactada", False), ("compactada e podada", True)]:
+			forest = Ensemble(NTREE, seed = 0)
+			forest.generate(data)
+			predictions = forest.predict_batch(rows)
+			oob_before = forest.oob_score()
+
+			start = perf_counter()
+			forest.predict_batch(rows)
+			before_time = perf_counter() - start
+
+			before, after = compact(forest, prune)
+
+			start = perf_counter()
+			compacted = forest.predict_batch(rows)
+			after_time = perf_counter() - start
+
+			equal = sum(p == c for p, c in zip(predictions, compacted)) / len(rows) * 100
+			print(f"  {label}: nodos {before} -> {after} ({after / before * 100:.1f}%) "
+					f"predições iguais={equal:.2f}% OOB {oob_before:.2f}% -> {forest.oob_score():.2f}% "
+					f"predict_batch {before_time * 1e3:.2f}ms -> {after_time * 1e3:.2f}ms")
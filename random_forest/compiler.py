@@ -0,0 +1,172 @@
+"""
+Criado por: Marcelo Jantsch Wille
+Email: marcelojantschwille@gmail.com
+Última modificação: 19/10/2026
+Descrição: Compilador de árvores de decisão e florestas treinadas para funções Python
+geradas: cada árvore vira uma sequência de 'if/else' aninhados sobre as colunas da
+instância, com limiares e valores categóricos embutidos no código. Usado para classificar
+uma instância por vez com baixa latência. Executado diretamente, compara latência e
+predições das funções geradas com 'fit' nos datasets do projeto.
+"""
+
+# Módulos de Python
+from csv import reader
+from time import perf_counter
+
+# Módulos próprios do projeto
+from tree import DecisionTree, Ensemble
+
+
+MAX_DEPTH = 40   # Profundidade máxima de 'if' aninhados numa função (subárvores abaixo viram funções)
+
+# Datasets usados na verificação e no microbenchmark
+DATA_PATHS = ["../data/house_votes_84.csv", "../data/wine_recognition.csv", "../data/benchmark.csv"]
+NTREE = 20       # Número de árvores da floresta compilada no microbenchmark
+
+
+def tree_source(decision_tree, name):
+	"""
+	Gera código da função 'name(row)' que classifica uma instância (lista de strings) com a
+	árvore. Subárvores mais profundas que 'MAX_DEPTH' viram funções auxiliares, para não
+	ultrapassar o limite de indentação do Python.
+	"""
+	functions = []
+	pending = [(name, decision_tree.root)]
+
+	while pending:
+		function_name, root = pending.pop()
+		lines = [f"def {function_name}(row):"]
+		node_lines(decision_tree, root, 1, lines, pending, name)
+		functions.append("\n".join(lines))
+
+	return "\n\n".join(reversed(functions))
+
+
+
+def node_lines(decision_tree, node, depth, lines, pending, name):
+	""" Acrescenta em 'lines' o código do nodo (e recursivamente dos filhos) com indentação 'depth' """
+	indent = "\t" * depth
+
+	# Folha retorna a classe predita
+	if decision_tree.feature[node] == -1:
+		lines.append(f"{indent}return {decision_tree.classes[decision_tree.value[node]]!r}")
+		return
+
+	# Subárvore profunda demais é gerada como outra função
+	if depth > MAX_DEPTH:
+		helper = f"{name}_node_{node}"
+		pending.append((helper, node))
+		lines.append(f"{indent}return {helper}(row)")
+		return
+
+	attr_i = int(decision_tree.feature[node])
+
+	# Numérico: ramo 'menor ou igual' ao limiar e ramo 'maior' (podem ser o mesmo nodo)
+	if decision_tree.attr_info[decision_tree.headers[attr_i]]['is_numeric']:
+		start = decision_tree.child_start[node]
+		lines.append(f"{indent}if float(row[{attr_i}]) <= {float(decision_tree.threshold[node])!r}:")
+		node_lines(decision_tree, int(decision_tree.children[start]), depth + 1, lines, pending, name)
+		lines.append(f"{indent}else:")
+		node_lines(decision_tree, int(decision_tree.children[start + 1]), depth + 1, lines, pending, name)
+		return
+
+	# Categórico: um ramo por valor com filho; demais valores (sem filho ou desconhecidos)
+	# recebem a predição padrão do nodo, como em 'fit'
+	lines.append(f"{indent}value = row[{attr_i}]")
+	for b, (attr_values, son) in enumerate(decision_tree.branch_values(node)):
+		keyword = "if" if b == 0 else "elif"
+		if len(attr_values) == 1:
+			lines.append(f"{indent}{keyword} value == {attr_values[0]!r}:")
+		else:
+			lines.append(f"{indent}{keyword} value in {tuple(attr_values)!r}:")
+		node_lines(decision_tree, son, depth + 1, lines, pending, name)
+	lines.append(f"{indent}return {decision_tree.classes[decision_tree.value[node]]!r}")
+
+
+
+def forest_source(ensemble):
+	""" Gera código das funções das árvores e da função 'predict(row)' da floresta (votação) """
+	sources = [tree_source(decision_tree, f"tree_{i}")
+				  for i, decision_tree in enumerate(ensemble.decision_trees)]
+
+	calls = ", ".join(f"tree_{i}(row)" for i in range(len(ensemble.decision_trees)))
+	sources.append("\n".join([
+		f"CLASSES = {list(ensemble.dataset.classes)!r}",
+		"",
+		"def predict(row):",
+		f"\tpredictions = [{calls}]",
+		"\treturn max(CLASSES, key=predictions.count)",   # Mesma votação (e desempate) de 'Ensemble.combine'
+	]))
+	return "\n\n\n".join(sources)
+
+
+
+def compile_model(model):
+	"""
+	Compila árvore ('DecisionTree') ou floresta ('Ensemble') treinada. Retorna a função gerada
+	que classifica uma instância (lista de strings) e o código fonte dela.
+	"""
+	if isinstance(model, Ensemble):
+		source = forest_source(model)
+	elif isinstance(model, DecisionTree):
+		source = tree_source(model, "predict")
+	else:
+		raise TypeError(f"Cannot compile object of type {type(model).__name__}.")
+
+	namespace = {}
+	exec(compile(source, "<compiled model>", "exec"), namespace)
+	return namespace['predict'], source
+
+
+
+def write_module(model, path):
+	""" Salva o código gerado da árvore ou floresta como módulo Python com a função 'predict(row)' """
+	_, source = compile_model(model)
+	with open(path, 'w') as fp:
+		fp.write(f'""" Modelo compilado gerado automaticamente por compiler.py """\n\n\n{source}\n')
+
+
+
+def latency(function, rows, repeats = 3):
+	""" Menor tempo médio (em microssegundos) por instância ao classificar todas as instâncias """
+	best = None
+	for _ in range(repeats):
+		start = perf_counter()
+		for row in rows:
+			function(row)
+		elapsed = (perf_counter() - start) / len(rows) * 1e6
+		best = elapsed if best is None else min(best, elapsed)
+	return best
+
+
+
+if __name__ == '__main__':
+
+	for data_path in DATA_PATHS:
+
+		data = []
+
+		# Abre e lê dados do arquivo com o dataset
+		with open(data_path, 'r') as fp:
+			csv_reader = reader(fp, delimiter=',')
+			for line in csv_reader:
+				data.append(line)
+
+		rows = data[1:]
+
+		decision_tree = DecisionTree()
+		decision_tree.train(data)
+		forest = Ensemble(NTREE)
+		forest.generate(data)
+
+		print(data_path)
+		for label, model in [("árvore", decision_tree), (f"floresta ({NTREE} árvores)", forest)]:
+			predict, _ = compile_model(model)
+
+			# Funções geradas devem dar exatamente as mesmas predições de 'fit'
+			equal = all(predict(row) == model.fit(row) for row in rows)
+
+			fit_latency = latency(model.fit, rows)
+			compiled_latency = latency(predict, rows)
+			print(f"  {label}: predições iguais={equal} fit={fit_latency:.2f}us "
+					f"compilado={compiled_latency:.2f}us ({fit_latency / compiled_latency:.1f}x)")
@@ -0,0 +1,182 @@
+"""
+Criado por: Marcelo Jantsch Wille
+Email: marcelojantschwille@gmail.com
+Última modificação: 19/10/2026
+Descrição: Conjunto de dados em colunas tipadas para o treino das árvores. Os dados
+lidos do CSV (listas de strings) são convertidos uma única vez: atributos numéricos viram
+vetores de float e atributos categóricos (e o atributo-alvo) viram vetores de códigos inteiros.
+Atributos numéricos também são quantizados em no máximo 255 faixas (bins) para a busca de
+divisões por histogramas. As faixas podem ser copiadas para memória compartilhada, para
+que processos treinem árvores sobre os mesmos dados sem copiá-los.
+"""
+
+# Módulos de Python
+from multiprocessing import shared_memory
+from itertools import chain, repeat
+from statistics import mode
+import numpy as np
+
+MAX_BINS = 255   # Número máximo de faixas (bins) de um atributo numérico
+
+
+class Dataset:
+	""" Dados de treino (com cabeçalho na primeira linha) convertidos em colunas """
+
+	def __init__(self, data, max_bins = MAX_BINS):
+		self.headers = list(data[0])       # Nomes dos atributos (último é o atributo-alvo)
+		self.rows = data[1:]               # Instâncias originais (usadas para classificação)
+		self.n_rows = len(self.rows)       # Número de instâncias
+		self.target_attr = self.headers[-1]
+		self.attr_info = {}                # Índice, tipo e codificação dos valores de cada atributo
+		self.columns = []                  # Coluna de cada atributo: float (numérico) ou código (categórico)
+		self.bins = []                     # Faixa de cada valor (numérico) ou código (categórico)
+		self.n_bins = []                   # Número de faixas/códigos de cada atributo
+		self.bin_edges = []                # Limite superior de cada faixa (somente atributos numéricos)
+
+		for i, header in enumerate(self.headers):
+			values = [entry[i] for entry in self.rows]
+			self.attr_info[header] = {'index': i, 'is_numeric': False}
+
+			# Atributo é numérico se todos os valores da coluna puderem ser convertidos para float
+			if i < len(self.headers) - 1:
+				try:
+					column = np.array(values, dtype=np.float64)
+				except ValueError:
+					pass
+				else:
+					self.attr_info[header]['is_numeric'] = True
+					self.columns.append(column)
+					self.add_bins(column, max_bins)
+					continue
+
+			# Codifica valores categóricos (e do alvo) pela sua posição na lista ordenada
+			codes = {value: code for code, value in enumerate(sorted(set(values)))}
+			self.attr_info[header]['values'] = list(codes)
+			self.attr_info[header]['codes'] = codes
+			self.columns.append(np.array([codes[value] for value in values], dtype=np.int32))
+			self.bins.append(self.columns[-1])
+			self.n_bins.append(len(codes))
+			self.bin_edges.append(None)
+
+		self.target = self.columns[-1]                              # Códigos do atributo-alvo
+		self.classes = self.attr_info[self.target_attr]['values']   # Valores do alvo (código = posição)
+		self.target_mode = mode(values)                             # Moda do atributo-alvo
+
+
+	def add_bins(self, column, max_bins = MAX_BINS):
+		"""
+		Quantiza coluna numérica em no máximo 'max_bins' faixas. Se a coluna tiver poucos valores
+		distintos, cada valor é uma faixa; senão, os limites são os quantis da coluna. O valor
+		x pertence à faixa b se bin_edges[b-1] < x <= bin_edges[b].
+		"""
+		edges = np.unique(column)
+		if len(edges) > max_bins:
+			edges = np.unique(np.quantile(column, np.linspace(0, 1, max_bins + 1)[1:]))
+
+		self.bins.append(np.searchsorted(edges, column, side='left').astype(np.uint8))
+		self.n_bins.append(len(edges))
+		self.bin_edges.append(edges)
+
+
+	def share(self):
+		"""
+		Copia as faixas de todos os atributos (a última é o alvo) para um bloco de memória
+		compartilhada. Retorna o bloco (que deve ser liberado por quem o criou) e a descrição
+		leve necessária para outro processo acessá-lo com 'Dataset.attach'.
+		"""
+		size = sum(bins.nbytes for bins in self.bins)
+		block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+		layout = []
+		offset = 0
+		for bins in self.bins:
+			np.ndarray(bins.shape, bins.dtype, buffer=block.buf, offset=offset)[:] = bins
+			layout.append((offset, bins.shape, bins.dtype.str))
+			offset += bins.nbytes
+
+		meta = {'metadata': self.metadata(), 'n_bins': self.n_bins, 'bin_edges': self.bin_edges}
+		return block, (block.name, layout, meta)
+
+
+	@classmethod
+	def attach(cls, description):
+		"""
+		Cria Dataset cujas faixas são visões do bloco de memória compartilhada descrito por
+		'description' (gerado por 'share'). Não tem as instâncias originais nem as colunas.
+		"""
+		name, layout, meta = description
+		dataset = cls.from_metadata(meta['metadata'])
+		dataset.block = shared_memory.SharedMemory(name=name)   # Mantém o bloco aberto enquanto usado
+
+		dataset.bins = [np.ndarray(shape, dtype, buffer=dataset.block.buf, offset=offset)
+							 for offset, shape, dtype in layout]
+		dataset.n_bins = meta['n_bins']
+		dataset.bin_edges = meta['bin_edges']
+		dataset.target = dataset.bins[-1]
+		return dataset
+
+
+	def metadata(self):
+		"""
+		Metadados do conjunto (nomes, tipos e codificação dos atributos, moda do alvo), sem
+		instâncias, colunas e faixas. Contém só tipos simples (serializável em JSON).
+		"""
+		return {'headers': self.headers, 'n_rows': self.n_rows, 'attr_info': self.attr_info,
+				  'target_mode': self.target_mode}
+
+
+	@classmethod
+	def from_metadata(cls, meta):
+		"""
+		Cria Dataset somente com os metadados (gerados por 'metadata'). Serve para codificar
+		instâncias ('encode') e classificar, mas não tem dados para treino.
+		"""
+		dataset = cls.__new__(cls)
+		dataset.headers = meta['headers']
+		dataset.rows = None
+		dataset.n_rows = meta['n_rows']
+		dataset.target_attr = dataset.headers[-1]
+		dataset.attr_info = meta['attr_info']
+		dataset.columns = None
+		dataset.bins = None
+		dataset.n_bins = None
+		dataset.bin_edges = None
+		dataset.target = None
+		dataset.classes = dataset.attr_info[dataset.target_attr]['values']
+		dataset.target_mode = meta['target_mode']
+		return dataset
+
+
+	def attr_arrays(self):
+		"""
+		Vetores com, para cada atributo (sem o alvo), se é numérico e o número de códigos dos
+		valores categóricos (0 se numérico)
+		"""
+		infos = [self.attr_info[header] for header in self.headers[:-1]]
+		return (np.array([info['is_numeric'] for info in infos], dtype=bool),
+				  np.array([0 if info['is_numeric'] else len(info['values']) for info in infos], dtype=np.intp))
+
+
+	def encode(self, rows):
+		"""
+		Converte instâncias (listas de strings, com ou sem o atributo-alvo) em matriz
+		(instância x atributo) de floats: valor dos atributos numéricos e código dos categóricos
+		(-1 para valor categórico desconhecido).
+		"""
+		# Colunas das instâncias (a do atributo-alvo, se houver, não é usada)
+		columns = list(zip(*rows)) or [()] * (len(self.headers) - 1)
+		matrix = np.empty((len(rows), len(self.headers) - 1))
+		numeric = []
+		for header in self.headers[:-1]:
+			info = self.attr_info[header]
+			i = info['index']
+			if info['is_numeric']:
+				numeric.append(i)
+			else:
+				matrix[:, i] = np.fromiter(map(info['codes'].get, columns[i], repeat(-1)), np.float64, len(rows))
+
+		# Valores numéricos de todas as colunas convertidos de uma vez
+		values = np.fromiter(map(float, chain.from_iterable(columns[i] for i in numeric)), np.float64,
+									len(numeric) * len(rows))
+		matrix[:, numeric] = values.reshape(len(numeric), len(rows)).T
+		return matrix
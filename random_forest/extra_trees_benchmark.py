@@ -0,0 +1,68 @@
+"""
+Criado por: Marcelo Jantsch Wille
+Email: marcelojantschwille@gmail.com
+Última modificação: 19/10/2026
+Descrição: Compara a floresta aleatória com o modo Extra-Trees (divisões sorteadas) nos
+datasets do projeto e em dados sintéticos maiores: tempo de treino e acurácia 'Out of Bag'
+de cada modo, com várias sementes.
+"""
+
+# Módulos de Python
+from csv import reader
+from statistics import mean
+from time import perf_counter
+
+# Módulos próprios do projeto
+from dataset import Dataset
+from forest_benchmark import synthetic_data
+from tree import Ensemble
+
+
+# Datasets comparados
+DATA_PATHS = ["../data/house_votes_84.csv", "../data/wine_recognition.csv", "../data/benchmark.csv"]
+NTREE = 50           # Número de árvores de cada floresta
+SEEDS = range(5)     # Sementes das florestas de cada modo
+SYNTHETIC_ROWS = 20000
+
+
+
+def compare(data, ntree = NTREE, seeds = SEEDS):
+	""" Treina florestas dos dois modos com cada semente. Retorna {modo: (tempo médio, acurácia OOB média)}. """
+	data = Dataset(data)
+
+	results = {}
+	for label, extra_trees in [("floresta aleatória", False), ("extra-trees", True)]:
+		runtimes, accuracies = [], []
+		for seed in seeds:
+			start = perf_counter()
+			forest = Ensemble(ntree, seed = seed, extra_trees = extra_trees)
+			forest.generate(data)
+			runtimes.append(perf_counter() - start)
+			accuracies.append(forest.oob_score())
+		results[label] = (mean(runtimes), mean(accuracies))
+
+	return results
+
+
+
+if __name__ == '__main__':
+
+	datasets = {}
+	for data_path in DATA_PATHS:
+		data = []
+
+		# Abre e lê dados do arquivo com o dataset
+		with open(data_path, 'r') as fp:
+			csv_reader = reader(fp, delimiter=',')
+			for line in csv_reader:
+				data.append(line)
+
+		datasets[data_path] = data
+
+	datasets["sintético"] = synthetic_data(SYNTHETIC_ROWS, 10, 5)
+
+	# Imprime tempo de treino e acurácia de cada modo
+	for name, data in datasets.items():
+		print(f"{name} ({len(data) - 1} instâncias, {NTREE} árvores)")
+		for label, (runtime, accuracy) in compare(data).items():
+			print(f"  {label:<20} tempo={runtime:.3f}s  acurácia OOB={accuracy:.2f}%")
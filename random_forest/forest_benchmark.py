@@ -0,0 +1,94 @@
+"""
+Criado por: Marcelo Jantsch Wille
+Email: marcelojantschwille@gmail.com
+Última modificação: 19/10/2026
+Descrição: Mede o tempo de treino da floresta aleatória para diferentes números de processos
+('n_jobs') e o ganho de velocidade em relação ao treino em um único processo. Usa o dataset
+'house_votes_84.csv' e dados sintéticos maiores.
+"""
+
+# Módulos de Python
+from csv import reader
+from time import perf_counter
+import os
+import random
+
+# Módulos próprios do projeto
+from dataset import Dataset
+from tree import Ensemble
+
+
+DATA_PATH = "../data/house_votes_84.csv"   # Caminho do arquivo com dados no sistema
+NTREE     = 50                             # Número de árvores de cada floresta treinada
+SEED      = 0                              # Semente da floresta (mesmas árvores para todo 'n_jobs')
+REPEATS   = 3                              # Execuções de cada configuração (vale o menor tempo)
+
+# Números de processos avaliados: potências de 2 até o número de núcleos (e o próprio número)
+N_JOBS = sorted({2**i for i in range(os.cpu_count().bit_length()) if 2**i <= os.cpu_count()}
+					 | {os.cpu_count()})
+
+# Dados sintéticos: número de instâncias, de atributos numéricos e de atributos categóricos
+SYNTHETIC_ROWS        = 20000
+SYNTHETIC_NUMERIC     = 10
+SYNTHETIC_CATEGORICAL = 5
+
+
+
+def synthetic_data(n_rows, n_numeric, n_categorical, seed = 0):
+	"""
+	Gera tabela (com cabeçalho) de atributos numéricos e categóricos aleatórios. A classe
+	depende de alguns atributos com ruído, para que as árvores tenham estrutura a aprender.
+	"""
+	rng = random.Random(seed)
+	headers = [f"num_{i}" for i in range(n_numeric)] + [f"cat_{i}" for i in range(n_categorical)]
+	data = [headers + ["classe"]]
+
+	for _ in range(n_rows):
+		numeric = [rng.gauss(0, 1) for _ in range(n_numeric)]
+		categorical = [rng.choice("abcd") for _ in range(n_categorical)]
+		score = sum(numeric[:3]) + (categorical[0] in "ab") + rng.gauss(0, 0.5)
+		target = "A" if score < 0 else "B" if score < 1.5 else "C"
+		data.append([f"{value:.3f}" for value in numeric] + categorical + [target])
+
+	return data
+
+
+
+def benchmark(data, n_jobs_values = N_JOBS, ntree = NTREE, repeats = REPEATS):
+	""" Treina a floresta com cada número de processos. Retorna {n_jobs: menor tempo em segundos}. """
+	data = Dataset(data)
+
+	runtimes = {}
+	for n_jobs in n_jobs_values:
+		times = []
+		for _ in range(repeats):
+			start = perf_counter()
+			Ensemble(ntree, n_jobs = n_jobs, seed = SEED).generate(data)
+			times.append(perf_counter() - start)
+		runtimes[n_jobs] = min(times)
+
+	return runtimes
+
+
+
+if __name__ == '__main__':
+
+	data = []
+
+	# Abre e lê dados do arquivo com o dataset
+	with open(DATA_PATH, 'r') as fp:
+		csv_reader = reader(fp, delimiter=',')
+		for line in csv_reader:
+			data.append(line)
+
+	datasets = {
+		"house_votes_84": data,
+		"sintético": synthetic_data(SYNTHETIC_ROWS, SYNTHETIC_NUMERIC, SYNTHETIC_CATEGORICAL),
+	}
+
+	# Imprime tempo e ganho de velocidade (speedup) de cada número de processos
+	for name, data in datasets.items():
+		print(f"{name} ({len(data) - 1} instâncias, {NTREE} árvores)")
+		runtimes = benchmark(data)
+		for n_jobs, runtime in runtimes.items():
+			print(f"  n_jobs={n_jobs:<3} tempo={runtime:.3f}s  speedup={runtimes[1] / runtime:.2f}x")
@@ -0,0 +1,400 @@
+"""
+Criado por: Marcelo Jantsch Wille
+Email: marcelojantschwille@gmail.com
+Última modificação: 19/10/2026
+Descrição: Árvore de Hoeffding (VFDT) para dados em fluxo: a árvore é treinada uma
+instância por vez, sem guardar os dados. Cada folha acumula histogramas (faixa x classe)
+das instâncias que chegam nela e é dividida quando o limite de Hoeffding garante que o
+atributo de maior ganho de informação é o melhor. As entropias e o ganho de informação são
+os mesmos da 'DecisionTree'. Também tem a floresta com 'bagging' online (Poisson(1)), cuja
+memória não cresce com o tamanho do fluxo. Executado diretamente, mede a acurácia
+prequencial (testa e depois treina cada instância) de um fluxo sintético.
+"""
+
+# Módulos de Python
+from math import log, log2, sqrt, ceil
+import numpy as np
+import random
+
+# Módulos próprios do projeto
+from dataset import Dataset
+from tree import DecisionTree, Ensemble
+
+
+WARMUP       = 1000    # Instâncias guardadas no início do fluxo para definir tipos, códigos e faixas
+MAX_BINS     = 32      # Número máximo de faixas dos atributos numéricos nas folhas
+GRACE_PERIOD = 200     # Peso de instâncias que uma folha recebe entre tentativas de divisão
+DELTA        = 1e-7    # Probabilidade de erro aceita no limite de Hoeffding
+TIE_EPSILON  = 0.05    # Limite abaixo do qual atributos empatados são divididos assim mesmo
+MAX_NODES    = 1000    # Número máximo de nodos de cada árvore da floresta online
+
+# Fluxo sintético usado na avaliação prequencial
+STREAM_ROWS = 100000
+NTREE       = 10
+
+
+class HoeffdingTree:
+	""" Árvore de decisão treinada incrementalmente, uma instância por vez """
+
+	def __init__(self, headers, max_height = None, has_sampling = False, seed = None,
+					 max_nodes = None, warmup = WARMUP, max_bins = MAX_BINS,
+					 grace_period = GRACE_PERIOD, delta = DELTA, tie_epsilon = TIE_EPSILON):
+		self.headers = list(headers)         # Nomes dos atributos (último é o atributo-alvo)
+		self.max_height = max_height         # Altura máxima da árvore
+		self.has_sampling = has_sampling     # Booleano que indica se folhas usam amostra de atributos
+		self.max_nodes = max_nodes           # Número máximo de nodos (None para ilimitado)
+		self.warmup = warmup                 # Instâncias do início do fluxo que definem o esquema
+		self.max_bins = max_bins             # Número máximo de faixas dos atributos numéricos
+		self.grace_period = grace_period     # Peso recebido pela folha entre tentativas de divisão
+		self.delta = delta                   # Probabilidade de erro do limite de Hoeffding
+		self.tie_epsilon = tie_epsilon       # Limite para desempate
+		self.rng = random.Random(seed) if seed is not None else random   # Sorteio dos atributos
+		self.buffer = []                     # Instâncias do início do fluxo (até definir o esquema)
+		self.dataset = None                  # Esquema: tipos, códigos e faixas ('Dataset' sem dados)
+		self.classes = []                    # Valores do atributo-alvo (código = posição na lista)
+		self.nodes = []                      # Nodos da árvore (índice 0 é a raíz)
+		self.n_seen = 0                      # Peso total de instâncias aprendidas
+
+
+	def initialize(self, dataset):
+		"""
+		Define o esquema (tipos, códigos dos categóricos e faixas dos numéricos) a partir de um
+		'Dataset' e cria a raíz. Somente os metadados e os limites das faixas são mantidos.
+		"""
+		self.dataset = Dataset.from_metadata(dataset.metadata())
+		self.dataset.bin_edges = dataset.bin_edges
+		self.dataset.n_bins = dataset.n_bins
+		self.classes = list(self.dataset.classes)
+		self.nodes = [self.create_leaf(list(self.headers[:-1]), 1, 0)]
+
+
+	def create_leaf(self, remaining, height, value):
+		"""
+		Cria folha que acumula histogramas dos atributos candidatos (todos os atributos ainda
+		não usados no caminho ou, com amostragem, raiz quadrada deles); 'value' é a classe padrão.
+		"""
+		attrs = remaining
+		if self.has_sampling:
+			attrs = self.rng.sample(remaining, ceil(sqrt(len(remaining))))
+
+		n_classes = len(self.classes)
+		hists = {}
+		if self.max_nodes is None or len(self.nodes) < self.max_nodes:
+			hists = {self.dataset.attr_info[attr]['index']:
+						np.zeros((self.dataset.n_bins[self.dataset.attr_info[attr]['index']], n_classes))
+						for attr in attrs}
+
+		return {
+			'feature': -1,                         # Índice do atributo testado (-1 se folha)
+			'threshold': None,                     # Limiar do atributo se for numérico
+			'children': None,                      # Filhos: [menor_igual, maior] ou um por código
+			'info_gain': 0,                        # Ganho de informação da divisão (0 se folha)
+			'value': value,                        # Classe padrão (enquanto a folha não tem instâncias)
+			'remaining': remaining,                # Atributos ainda não usados no caminho até a folha
+			'attrs': attrs,                        # Atributos candidatos à divisão
+			'height': height,                      # Altura do nodo
+			'class_counts': np.zeros(n_classes),   # Peso de instâncias de cada classe
+			'hists': hists,                        # Histogramas (faixa x classe) dos atributos candidatos
+			'pending': 0,                          # Peso recebido desde a última tentativa de divisão
+		}
+
+
+	def learn(self, row, weight = 1):
+		""" Aprende uma instância (lista de strings com o atributo-alvo) com o peso dado """
+		self.learn_many([row], [weight])
+
+
+	def learn_many(self, rows, weights = None):
+		"""
+		Aprende instâncias na ordem em que chegaram. As primeiras 'warmup' instâncias são
+		guardadas até definirem o esquema e então aprendidas; depois, nada é guardado.
+		"""
+		if weights is None:
+			weights = [1] * len(rows)
+
+		if self.dataset is None:
+			self.buffer.extend(zip(rows, weights))
+			if len(self.buffer) < self.warmup:
+				return
+			rows, weights = zip(*self.buffer)
+			self.buffer = []
+			self.initialize(Dataset([self.headers] + list(rows), self.max_bins))
+
+		matrix, bins = self.encode(rows)
+		for row, values, row_bins, weight in zip(rows, matrix, bins, weights):
+			if weight > 0:
+				self.learn_encoded(values, row_bins, self.class_code(row[-1]), weight)
+
+
+	def encode(self, rows):
+		""" Codifica instâncias: matriz de valores ('Dataset.encode') e matriz de faixas/códigos """
+		matrix = self.dataset.encode(rows)
+		bins = np.empty(matrix.shape, dtype=np.int64)
+		for i, edges in enumerate(self.dataset.bin_edges[:-1]):
+			if edges is None:
+				bins[:, i] = matrix[:, i]
+			else:
+				# Valores acima do maior limite ficam na última faixa
+				bins[:, i] = np.minimum(np.searchsorted(edges, matrix[:, i], side='left'), len(edges) - 1)
+		return matrix, bins
+
+
+	def class_code(self, label):
+		""" Código da classe; classe nova no fluxo ganha código e coluna em todas as contagens """
+		if label not in self.classes:
+			self.classes.append(label)
+			for node in self.nodes:
+				node['class_counts'] = np.append(node['class_counts'], 0)
+				for attr_i, hist in node['hists'].items():
+					node['hists'][attr_i] = np.pad(hist, ((0, 0), (0, 1)))
+		return self.classes.index(label)
+
+
+	def learn_encoded(self, values, bins, class_code, weight):
+		""" Leva a instância codificada até a folha, atualiza as contagens e tenta dividir a folha """
+		self.n_seen += weight
+		node_i = self.route(values)
+		node = self.nodes[node_i]
+
+		node['class_counts'][class_code] += weight
+		for attr_i, hist in node['hists'].items():
+			# Valor categórico desconhecido não entra no histograma
+			if bins[attr_i] >= 0:
+				hist[bins[attr_i], class_code] += weight
+
+		node['pending'] += weight
+		if node['pending'] >= self.grace_period:
+			node['pending'] = 0
+			self.try_split(node)
+
+
+	def route(self, values):
+		"""
+		Percorre a árvore com a instância codificada e retorna o índice do nodo final: a folha
+		ou o nodo categórico sem filho para o valor (desconhecido) da instância.
+		"""
+		node_i = 0
+		while self.nodes[node_i]['feature'] != -1:
+			node = self.nodes[node_i]
+			value = values[node['feature']]
+			if node['threshold'] is not None:
+				son = node['children'][0 if value <= node['threshold'] else 1]
+			else:
+				son = node['children'].get(int(value))
+			if son is None:
+				return node_i
+			node_i = son
+		return node_i
+
+
+	def try_split(self, node):
+		"""
+		Divide a folha se o limite de Hoeffding sqrt(R² ln(1/delta) / 2n), com R = log2(número de
+		classes) e n o peso de instâncias da folha, for menor que a diferença de ganho de
+		informação entre o melhor atributo e o segundo melhor (ou não dividir, ganho 0).
+		"""
+		class_counts = node['class_counts']
+
+		# Critérios de parada: folha pura, altura máxima ou sem atributos/histogramas
+		if np.count_nonzero(class_counts) < 2 or not node['hists']:
+			return
+		if self.max_height and node['height'] == self.max_height:
+			return
+
+		target_entropy = DecisionTree.get_target_entropy(class_counts)
+		gains = []
+		for attr_i, hist in node['hists'].items():
+			# Atributo precisa de entradas em ao menos dois valores/faixas para dividir
+			if np.count_nonzero(hist.sum(axis=1)) < 2:
+				continue
+			if self.dataset.bin_edges[attr_i] is not None:
+				entropy, split_bin = DecisionTree.get_numerical_entropy(hist)
+			else:
+				entropy, split_bin = DecisionTree.get_categorical_entropy(hist), None
+			gains.append((DecisionTree.info_gain(target_entropy, entropy), attr_i, split_bin))
+
+		if not gains:
+			return
+		gains.sort(key=lambda gain: gain[0], reverse=True)
+		best = gains[0]
+		second = gains[1][0] if len(gains) > 1 else 0
+
+		n = class_counts.sum()
+		epsilon = sqrt(log2(len(self.classes)) ** 2 * log(1 / self.delta) / (2 * n))
+		if best[0] > 0 and (best[0] - max(second, 0) > epsilon or epsilon < self.tie_epsilon):
+			self.split(node, *best)
+
+
+	def split(self, node, info_gain, attr_i, split_bin):
+		"""
+		Transforma a folha em nodo de decisão pelo atributo 'attr_i'. Numérico: filhos menor ou
+		igual e maior que o limite da faixa 'split_bin'; categórico: um filho por valor
+		visto na folha (valores sem filho param no nodo, com a sua classe padrão). A classe
+		padrão de cada filho vem do histograma do atributo na folha.
+		"""
+		hist = node['hists'][attr_i]
+		attr = self.headers[attr_i]
+		attrs = [candidate for candidate in node['remaining'] if candidate != attr]
+
+		if split_bin is not None:
+			counts = [hist[:split_bin + 1].sum(axis=0), hist[split_bin + 1:].sum(axis=0)]
+			keys = [0, 1]
+		else:
+			keys = np.flatnonzero(hist.sum(axis=1) > 0).tolist()
+			counts = [hist[key] for key in keys]
+
+		if self.max_nodes is not None and len(self.nodes) + len(keys) > self.max_nodes:
+			node['hists'] = {}   # Árvore cheia: folha para de acumular histogramas
+			return
+
+		children = {}
+		for key, son_counts in zip(keys, counts):
+			value = int(son_counts.argmax()) if son_counts.sum() > 0 else int(node['class_counts'].argmax())
+			children[key] = len(self.nodes)
+			self.nodes.append(self.create_leaf(attrs, node['height'] + 1, value))
+
+		node['feature'] = attr_i
+		node['threshold'] = float(self.dataset.bin_edges[attr_i][split_bin]) if split_bin is not None else None
+		node['children'] = [children[0], children[1]] if split_bin is not None else children
+		node['value'] = int(node['class_counts'].argmax())
+		node['info_gain'] = info_gain
+		node['hists'] = {}
+
+
+	def predict_code(self, values):
+		""" Código da classe predita para a instância codificada """
+		node = self.nodes[self.route(values)]
+		if node['feature'] == -1 and node['class_counts'].sum() > 0:
+			return int(node['class_counts'].argmax())
+		return node['value']
+
+
+	def fit(self, instance):
+		""" Classifica nova instância (lista de strings, com ou sem o atributo-alvo) """
+		return self.predict_batch([instance])[0]
+
+
+	def predict_batch(self, rows):
+		""" Classifica uma lista de instâncias (codificadas uma única vez) """
+		if self.dataset is None:
+			# Esquema ainda não definido: classe mais frequente das instâncias guardadas (empate
+			# com a menor em ordem alfabética, como em 'OnlineEnsemble.combine')
+			labels = [row[-1] for row, _ in self.buffer]
+			return [max(sorted(set(labels)), key=labels.count) if labels else None] * len(rows)
+
+		matrix = self.dataset.encode(rows)
+		return [self.classes[self.predict_code(values)] for values in matrix]
+
+
+
+class OnlineEnsemble:
+	"""
+	Floresta de árvores de Hoeffding com 'bagging' online: cada instância do fluxo é aprendida
+	por cada árvore k ~ Poisson(1) vezes (peso k), o que aproxima o bootstrap sem guardar os
+	dados. Com 'max_nodes', a memória da floresta é limitada qualquer que seja o fluxo.
+	"""
+
+	def __init__(self, headers, ntree, max_height = None, seed = None, max_nodes = MAX_NODES,
+					 warmup = WARMUP, **tree_params):
+		self.headers = list(headers)   # Nomes dos atributos (último é o atributo-alvo)
+		self.number_of_trees = ntree   # Número de árvores da floresta
+		self.warmup = warmup           # Instâncias do início do fluxo que definem o esquema
+		# Semente da floresta (sorteada do estado global se não for passada)
+		self.seed = seed if seed is not None else random.getrandbits(64)
+		self.rng = np.random.default_rng(self.seed)   # Sorteio dos pesos de Poisson
+		self.buffer = []               # Instâncias do início do fluxo (até definir o esquema)
+		self.decision_trees = [HoeffdingTree(headers, max_height, has_sampling = True,
+														 seed = Ensemble.tree_seed(self.seed, i),
+														 max_nodes = max_nodes, **tree_params)
+									  for i in range(ntree)]
+
+
+	def learn(self, row):
+		""" Aprende uma instância (lista de strings com o atributo-alvo) """
+		self.learn_many([row])
+
+
+	def learn_many(self, rows):
+		""" Aprende instâncias na ordem em que chegaram, com pesos Poisson(1) em cada árvore """
+		if self.decision_trees[0].dataset is None:
+			self.buffer.extend(rows)
+			if len(self.buffer) < self.warmup:
+				return
+			rows, self.buffer = self.buffer, []
+
+			# Esquema é definido uma única vez e compartilhado por todas as árvores
+			dataset = Dataset([self.headers] + rows, self.decision_trees[0].max_bins)
+			for decision_tree in self.decision_trees:
+				decision_tree.initialize(dataset)
+
+		weights = self.rng.poisson(1, (len(self.decision_trees), len(rows)))
+		matrix, bins = self.decision_trees[0].encode(rows)
+		for decision_tree, tree_weights in zip(self.decision_trees, weights.tolist()):
+			for row, values, row_bins, weight in zip(rows, matrix, bins, tree_weights):
+				if weight > 0:
+					decision_tree.learn_encoded(values, row_bins, decision_tree.class_code(row[-1]), weight)
+
+
+	def fit(self, instance):
+		""" Faz classificação de nova instância na floresta """
+		return self.predict_batch([instance])[0]
+
+
+	def predict_batch(self, rows):
+		""" Classifica uma lista de instâncias por votação das árvores """
+		if self.decision_trees[0].dataset is None:
+			labels = [row[-1] for row in self.buffer]
+			return [max(sorted(set(labels)), key=labels.count) if labels else None] * len(rows)
+
+		predictions = [decision_tree.predict_batch(rows) for decision_tree in self.decision_trees]
+		return [self.combine(list(votes)) for votes in zip(*predictions)]
+
+
+	def combine(self, predictions):
+		"""
+		Combinação por votação majoritária. Empate fica com a menor classe em ordem alfabética,
+		que é a de menor código no 'Dataset' (mesmo desempate de 'Ensemble.combine'); os códigos
+		de cada árvore não servem, pois classes novas no fluxo são numeradas por árvore.
+		"""
+		return max(sorted(set(predictions)), key=predictions.count)
+
+
+
+def prequential_accuracy(model, rows, batch = 1000):
+	"""
+	Acurácia (%) prequencial: cada lote de instâncias é classificado antes de ser aprendido.
+	O primeiro lote (sem modelo) não é avaliado.
+	"""
+	correct = total = 0
+	for start in range(0, len(rows), batch):
+		chunk = rows[start:start + batch]
+		if start > 0:
+			predictions = model.predict_batch(chunk)
+			correct += sum(prediction == row[-1] for prediction, row in zip(predictions, chunk))
+			total += len(chunk)
+		model.learn_many(chunk)
+	return correct / total * 100
+
+
+
+if __name__ == '__main__':
+
+	from forest_benchmark import synthetic_data
+
+	data = synthetic_data(STREAM_ROWS, 10, 5)
+	headers, rows = data[0], data[1:]
+
+	# Árvore em lote treinada com a primeira metade do fluxo, para referência
+	half = len(rows) // 2
+	decision_tree = DecisionTree()
+	decision_tree.train([headers] + rows[:half])
+	batch_predictions = decision_tree.predict_batch(rows[half:])
+	batch_accuracy = sum(p == row[-1] for p, row in zip(batch_predictions, rows[half:])) / (len(rows) - half) * 100
+
+	hoeffding_tree = HoeffdingTree(headers, seed = 0)
+	forest = OnlineEnsemble(headers, NTREE, seed = 0)
+	print(f"Fluxo sintético ({len(rows)} instâncias)")
+	print(f"  árvore de Hoeffding: acurácia prequencial={prequential_accuracy(hoeffding_tree, rows):.2f}% "
+			f"({len(hoeffding_tree.nodes)} nodos)")
+	print(f"  floresta online ({NTREE} árvores): acurácia prequencial={prequential_accuracy(forest, rows):.2f}%")
+	print(f"  árvore em lote (metade do fluxo): acurácia na outra metade={batch_accuracy:.2f}%")
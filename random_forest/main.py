@@ -1,7 +1,7 @@
 """
 Criado por: Marcelo Jantsch Wille
 Email: marcelojantschwille@gmail.com
-Última modificação: 20/10/2021
+Última modificação: 19/10/2026
 Descrição: Avaliação do desempenho do modelo usando cross-validation.
 Gera imagem do gráfico com as acurácias para diferentes valores de ntree.
 """
@@ -11,7 +11,7 @@ import matplotlib.pyplot as plt
 from csv import reader
 
 # Módulos próprios do projeto
-from validation import cross_validation
+from validation import cross_validation_curve
 
 
 DATA_PATH = "../data/house_votes_84.csv"   # Caminho do arquivo com dados no sistema
@@ -35,9 +35,12 @@ if __name__ == '__main__':
 
 	ntrees = [n for n in range(5, 101, 5)]
 
+	# Uma única floresta (com o maior 'ntree') por fold, avaliada em cada número de árvores
+	curve = cross_validation_curve(data, ntrees, K = CROSS_K, max_height = MAX_H)
+
 	accuracies = []
 	for ntree in ntrees:
-		accuracy, stdev = cross_validation(data, ntree, K = CROSS_K, max_height = MAX_H)
+		accuracy, stdev = curve[ntree]
 		accuracies.append(accuracy)
 		print(f"ntree = {ntree} ------> accuracy = {accuracy:.2f}%")
 
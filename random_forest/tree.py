@@ -1,197 +1,532 @@
 """
 Criado por: Marcelo Jantsch Wille
 Email: marcelojantschwille@gmail.com
-Última modificação: 20/10/2021
+Última modificação: 19/10/2026
 Descrição: Implementação da Árvore de Decisão e da Floresta Aleatória.
 """
 
 # Módulos de Python
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import graphviz as gz
-from math import log2, sqrt, ceil
-from statistics import mode, mean
-from random import choice
-
-
-def bootstrap(data, p = 0.7):
-	""" Mecanismo de amostragem com reposição para criação de conjuntos de treino e teste """
-
-	# Conjuntos de treino (sorteados com reposição) e 'Out of Bag' (instâncias não sorteadas)
-	train_sample = []
-	oob_sample  = []
+import json
+import numpy as np
+from math import log, log2, sqrt, ceil
+import random
+
+# Módulos próprios do projeto
+from dataset import Dataset
+
+
+# Dados compartilhados com os processos que treinam árvores (preenchido no 'init_worker')
+_dataset = None
+
+# Número mínimo de entradas para que os atributos candidatos sejam avaliados em paralelo (threads)
+PARALLEL_MIN_ENTRIES = 50000
+
+SUBSAMPLE_SIZE = 10000   # Tamanho da subamostra usada para estimar a divisão de nodos grandes
+SUBSAMPLE_DELTA = 1e-6   # Probabilidade de erro aceita no limite de Hoeffding da subamostra
+DESCEND_PACK = 0.15      # Fração de instâncias já em folhas a partir da qual 'descend' as retira
+DESCEND_CHUNK = 16384    # Instâncias levadas juntas por 'descend' (vetores cabem na cache)
+
+# Formato binário da floresta salva: assinatura, versão, tamanho dos metadados (JSON) e,
+# alinhados em 8 bytes, os vetores de nodos de todas as árvores concatenados. Os metadados
+# guardam a raíz de cada árvore (árvores compactadas compartilham vetores de nodos)
+MODEL_MAGIC = b"RFOREST\0"
+MODEL_VERSION = 1
+MODEL_HEADER = np.dtype([('magic', 'S8'), ('version', '<u4'), ('meta_size', '<u4')])
+MODEL_ARRAYS = {                     # Vetores de nodos e seus tipos no arquivo (little-endian)
+	'feature': '<i4',
+	'threshold': '<f8',
+	'child_start': '<i4',
+	'value': '<i4',
+	'info_gain': '<f8',
+	'children': '<i4',
+}
+
+
+def bootstrap(n_rows, p = 0.7, rng = random):
+	"""
+	Mecanismo de amostragem com reposição para criação de conjuntos de treino e teste.
+	Sorteia índices das 'n_rows' instâncias e retorna quantas vezes cada uma foi sorteada
+	e os índices das instâncias 'Out of Bag' (não sorteadas nenhuma vez).
+	"""
 
 	# Sorteia porcentagem 'p' das instâncias para comporem conjunto de treino
-	for _ in range(int(len(data) * p)):
-		train_sample.append(choice(data))
-
-	# Preenche 'Out of Bag' com quem não foi sorteado
-	for entry in data:
-		if entry not in train_sample:
-			oob_sample.append(entry)
-
-	return train_sample, oob_sample
-
-
-
-def is_numeric(str_value):
-	""" Verifica se valor pertence ao tipo float ou ao tipo int """
-	try:
-		a = float(str_value)
-	except (TypeError, ValueError):
-		try:
-			b = int(str_value)
-		except (TypeError, ValueError):
-			return False
-		else:
-			return True
-	else:
-		return True
+	draws = np.random.default_rng(rng.getrandbits(64)).integers(0, n_rows, int(n_rows * p))
+	counts = np.bincount(draws, minlength=n_rows)
+
+	# 'Out of Bag' são as instâncias com contagem zero
+	return counts, np.flatnonzero(counts == 0)
+
+
+
+def route_arrays(feature, threshold, child_start, children, value, is_numeric, n_codes, n_classes):
+	"""
+	Vetores de nodos preparados para 'descend', em que toda instância sempre tem para onde ir.
+	Cada nodo fica no início do seu bloco de filhos: dois ramos (menor ou igual, maior), ou
+	ramo -1 (valor desconhecido, logo antes do nodo) e um ramo por código se categórico. As
+	folhas apontam para elas mesmas no ramo 0 e usam a coluna extra de 'route_values'. O ramo
+	-1 e os valores sem filho levam a uma folha extra com a predição padrão do nodo (uma folha
+	por classe, depois dos nodos). O limiar é nan nos nodos categóricos e inf nas folhas (nunca
+	é limiar de divisão, que fica abaixo do último limite de faixa). Retorna atributo, limiar,
+	filhos e classe de cada posição, e a posição de cada nodo original.
+	"""
+	n_nodes = len(feature)
+	feature = np.concatenate((feature.astype(np.intp), np.full(n_classes, -1, dtype=np.intp)))
+	child_start = np.concatenate((child_start.astype(np.intp), np.full(n_classes, -1, dtype=np.intp)))
+	value = np.concatenate((value, np.arange(n_classes, dtype=value.dtype)))
+	inner = feature != -1
+	attr = np.maximum(feature, 0)
+	categorical = inner & ~is_numeric[attr]
+
+	# Bloco de filhos de cada nodo: dois ramos ou ramo -1 e um por código
+	sizes = np.where(categorical, n_codes[attr] + 1, 2)
+	positions = np.cumsum(sizes) - sizes + categorical
+	owner = np.repeat(np.arange(len(sizes)), sizes)
+	branch = np.arange(len(owner)) - positions[owner]
+
+	children = np.append(children.astype(np.intp), -1)   # Posição extra: floresta só de folhas
+	sons = np.where(inner[owner], children[np.maximum(child_start[owner] + branch, 0)], owner)
+	fallback = n_nodes + value[owner].astype(np.intp)
+	sons = np.where(categorical[owner] & ((branch == -1) | (sons == -1)), fallback, sons)
+
+	route = (np.zeros(len(owner), dtype=np.intp), np.zeros(len(owner)), positions[sons],
+				np.zeros(len(owner), dtype=value.dtype))
+	route[0][positions] = np.where(inner, attr, len(is_numeric))
+	route[1][positions] = np.where(inner, np.where(categorical, np.nan, np.append(threshold, np.zeros(n_classes))), np.inf)
+	route[3][positions] = value
+	return route, positions[:n_nodes]
+
+
+
+def route_values(matrix, is_numeric):
+	"""
+	Matriz codificada ('Dataset.encode') separada para 'descend': valores (nan dos numéricos
+	vira inf, que também vai para o ramo maior) e códigos dos categóricos (0 nos numéricos),
+	com uma coluna extra de zeros para as folhas. Retorna os dois como vetores (o atributo 'a'
+	da instância 'i' fica em i * largura + a) e a largura das linhas.
+	"""
+	width = matrix.shape[1] + 1
+	values = np.zeros((len(matrix), width))
+	codes = np.zeros((len(matrix), width), dtype=np.intp)
+	values[:, :-1] = matrix
+	values[np.isnan(values)] = np.inf
+	codes[:, :-1][:, ~is_numeric] = matrix[:, ~is_numeric]
+	return values.ravel(), codes.ravel(), width
+
+
+
+def descend(route, values, codes, offsets, nodes):
+	"""
+	Leva cada instância do seu nodo inicial ('nodes') até o nodo final, todas juntas: a cada
+	passo, as instâncias descem um nível, com operações sobre vetores ('route' vem de
+	'route_arrays', 'values' e 'codes' de 'route_values', e os atributos da instância começam
+	em 'offsets'). Sem desvios, o ramo é o código do valor mais 1 se o valor passa do limiar
+	(nunca nos categóricos, de limiar nan). As instâncias são levadas em blocos de
+	'DESCEND_CHUNK' e as que já chegaram numa folha são retiradas quando passam de
+	'DESCEND_PACK' das restantes. Retorna os nodos finais.
+	"""
+	feature, threshold, children, _ = route
+	nodes = nodes.copy()
+
+	for start in range(0, len(nodes), DESCEND_CHUNK):
+		active = np.arange(start, min(start + DESCEND_CHUNK, len(nodes)))
+		current, chunk_offsets = nodes[start:start + DESCEND_CHUNK], offsets[start:start + DESCEND_CHUNK]
+		while True:
+			limits = threshold.take(current)
+			going = limits != np.inf
+			if np.count_nonzero(going) < (1 - DESCEND_PACK) * len(going):
+				nodes[active] = current
+				keep = np.flatnonzero(going)
+				if not len(keep):
+					break
+				active, current, chunk_offsets, limits = active.take(keep), current.take(keep), chunk_offsets.take(keep), limits.take(keep)
+
+			index = feature.take(current)
+			index += chunk_offsets
+			branch = codes.take(index)
+			branch += values.take(index) > limits
+			branch += current
+			current = children.take(branch)
+
+	return nodes
 
 
 
 class DecisionTree:
 	""" Contém métodos para geração da árvore e classificação de novas instâncias """
 
-	def __init__(self, max_height = None, has_sampling = False, has_bootstrap = False):
-		self.tree = {}                       # Estrutura da árvore de decisão
-		self.root = "Root"                   # Nome do nodo raíz
+	def __init__(self, max_height = None, has_sampling = False, has_bootstrap = False, seed = None,
+					 max_nodes = None, max_hist_memory = None, extra_trees = False, n_threads = 1,
+					 parallel_min_entries = PARALLEL_MIN_ENTRIES, subsample_above = None,
+					 subsample_size = SUBSAMPLE_SIZE, subsample_delta = SUBSAMPLE_DELTA):
+		self.tree = {}                       # Estrutura da árvore de decisão (somente durante o treino)
+		self.root = "Root"                   # Nome do nodo raíz (índice 0 na representação compacta)
 		self.max_height = max_height         # Altura máxima da árvore
+		self.max_nodes = max_nodes           # Número máximo de nodos da árvore (None para ilimitado)
+		self.max_hist_memory = max_hist_memory  # Bytes máximos de histogramas herdados guardados por nível
+		self.hist_memory = 0                 # Bytes de histogramas herdados guardados no nível atual
 		self.has_sampling = has_sampling     # Booleano que indica se tem amostragem de m atributos
 		self.has_bootstrap = has_bootstrap   # Booleano que indica se tem bootstrap
-		self.boot_train_set = None           # Conjundo de dados de treino do bootstrap
-		self.boot_test_set = None            # Conjunto de dados de teste do bootstrap
+		self.extra_trees = extra_trees       # Booleano que indica se divisões são sorteadas (Extra-Trees)
+		self.n_threads = n_threads           # Threads que avaliam atributos candidatos em nodos grandes
+		self.parallel_min_entries = parallel_min_entries  # Entradas mínimas para avaliação em paralelo
+		self.executor = None                 # Pool de threads (somente durante o treino)
+		self.subsample_above = subsample_above  # Nodos com mais entradas estimam a divisão numa subamostra
+		self.subsample_size = subsample_size    # Tamanho da subamostra desses nodos
+		self.subsample_delta = subsample_delta  # Probabilidade de erro do limite de Hoeffding
+		self.seed = seed                     # Semente dos sorteios da árvore (None usa o estado global)
+		self.rng = None                      # Gerador de números aleatórios (somente durante o treino)
+		self.boot_train_set = None           # Índices das instâncias de treino do bootstrap
+		self.weights = None                  # Vezes que cada instância foi sorteada no bootstrap
+		self.boot_test_set = None            # Índices das instâncias de teste do bootstrap
+		self.dataset = None                  # Dados de treino em colunas (compartilhado pela floresta)
+		self.index = None                    # Índices das entradas de treino, particionados pelos nodos
 		self.target_attr = None              # Label do atributo-alvo
 		self.target_mode = None              # Moda do atributo-alvo
 		self.attr_info = {}                  # Informação do índice e conjunto de valores de cada atributo
-
-
-	def create_node(self, node_name, attrs, entries):
-		""" Cria nodo na árvore de decisão self.tree da instância """
+		self.headers = []                    # Nomes dos atributos, na ordem das colunas dos dados
+		self.classes = []                    # Valores possíveis do atributo-alvo (código = posição na lista)
+
+		# Representação compacta da árvore gerada ao final do treino (um elemento por nodo)
+		self.feature = None       # Índice da coluna do atributo testado no nodo (-1 se folha)
+		self.threshold = None     # Limiar do atributo se for numérico (nan caso contrário)
+		self.child_start = None   # Posição dos filhos do nodo em 'children' (-1 se folha)
+		self.children = None      # Filhos: [menor_igual, maior] se numérico ou um por código se categórico
+		self.value = None         # Classe predita na folha ou padrão do nodo (moda do alvo) se sem filho
+		self.info_gain = None     # Ganho de informação do nodo (0 se folha)
+
+		# Cópia dos vetores em listas Python, usada por 'fit_code' (criada no primeiro 'fit')
+		self.fit_tables = None
+		# Vetores preparados para 'descend', usados por 'predict_codes' (criados no primeiro uso)
+		self.route_tables = None
+
+
+	def __getstate__(self):
+		"""
+		Árvore é serializada sem as listas de 'fit_code' e os vetores de 'predict_codes'
+		(refeitos no primeiro uso)
+		"""
+		state = self.__dict__.copy()
+		state['fit_tables'] = None
+		state['route_tables'] = None
+		return state
+
+
+	def attach(self, dataset):
+		""" Associa a árvore treinada aos dados de treino (necessários para 'fit' e 'fit_bootstrap') """
+		self.dataset = dataset
+		self.attr_info = dataset.attr_info
+
+
+	def create_node(self, node_name, attrs, start, end):
+		"""
+		Cria nodo na árvore de decisão self.tree da instância. As entradas do nodo são
+		o trecho [start, end) do vetor de índices compartilhado 'self.index' (sem cópia).
+		"""
 
 		self.tree[node_name]              = {}       # Cria nodo
 		self.tree[node_name]['label']     = None     # Label que vai ser preenchido com atributo depois
 		self.tree[node_name]['print']     = None     # Nome do nodo que vai ser impresso
-		self.tree[node_name]['avg']       = None     # Valor a ser preenchido se atributo for numérico (média)
+		self.tree[node_name]['threshold'] = None     # Valor a ser preenchido se atributo for numérico (limiar)
 		self.tree[node_name]['info_gain'] = None     # Ganho de informação no nodo
 		self.tree[node_name]['attrs']     = attrs    # Atributos disponíveis para próxima ramificação
-		self.tree[node_name]['entries']   = entries  # Todas as entradas disponíveis para próxima ramificação
+		self.tree[node_name]['entries']   = self.index[start:end]  # Índices das entradas do nodo (visão)
+		self.tree[node_name]['start']     = start    # Início do trecho do nodo em 'self.index'
+		self.tree[node_name]['end']       = end      # Fim do trecho do nodo em 'self.index'
 		self.tree[node_name]['branches']  = {}       # Ramos para os quais este node irá apontar
+		self.tree[node_name]['hists']     = {}       # Histogramas (faixa x classe) dos atributos nas entradas
 
 
 	def train(self, data):
-		""" Gera estrutura da árvode baseado nos dados de entrada """
-
-		# Pega nomes dos atributos e seus respectivos índices
-		headers = data[0]
-		for i, header in enumerate(headers):
-			self.attr_info[header] = {'index': i, 'value_set': set(), 'is_numeric': None}
-
-		# Define atributo-alvo (precisa ser o último da lista dos dados)
-		self.target_attr = headers[-1]
-
-		# Pega dados (cada entrada na tabela), valores possíveis e tipo (numérico, categórico) de cada atributo
-		entries = []
-		targets = []
-		for entry in data[1:]:
-			entries.append(entry)
-			targets.append(entry[-1])
-			# Monta o conjunto de valores possíveis para cada atributo
-			for header, value in zip(headers, entry):
-				self.attr_info[header]['value_set'].add(value)
-				# Define se atributo é numérico ou categórico caso ainda não tenha sido definido
-				if not self.attr_info[header]['is_numeric']:
-					self.attr_info[header]['is_numeric'] = is_numeric(value)
-
-		# Define moda do atributo-alvo
-		self.target_mode = mode(targets)
+		"""
+		Gera estrutura da árvode baseado nos dados de entrada. Os dados podem ser
+		a tabela lida do arquivo (com cabeçalho) ou um 'Dataset' já convertido em colunas.
+		"""
+
+		# Converte os dados em colunas tipadas (uma única vez, se já não vierem convertidos)
+		if not isinstance(data, Dataset):
+			data = Dataset(data)
+		self.dataset = data
+
+		# Pega nomes dos atributos, metainformação de cada um e valores possíveis do atributo-alvo
+		headers = data.headers
+		self.headers = headers
+		self.attr_info = data.attr_info
+		self.target_attr = data.target_attr
+		self.target_mode = data.target_mode
+		self.classes = data.classes
+
+		# Entradas de dados são os índices das instâncias nas colunas. Esse vetor é o único
+		# alocado para as entradas: cada nodo é um trecho dele, particionado ao ramificar
+		self.index = np.arange(data.n_rows)
+
+		# Sorteios (bootstrap e amostragem de atributos) usam a semente da árvore, se houver
+		self.rng = random.Random(self.seed) if self.seed is not None else random
 
 		# Se bootsrap, usa como entrada do algoritmo conjunto de treino do bootstrap
+		# (cada instância sorteada entra uma vez, com peso igual ao número de vezes que foi sorteada)
 		if self.has_bootstrap:
-			self.boot_train_set, self.boot_test_set = bootstrap(entries)
-			entries = self.boot_train_set
+			self.weights, self.boot_test_set = bootstrap(data.n_rows, rng = self.rng)
+			self.boot_train_set = np.flatnonzero(self.weights)
+			self.index = self.boot_train_set.copy()
 
 		# Cria nodo raíz
 		self.create_node(self.root,                 # Nome do nodo inicial é "Root"
 							  headers[:len(headers)-1],  # Todos os atributos menos a coluna y
-							  entries)                   # Todas as entradas de dados
+							  0, len(self.index))        # Todas as entradas de dados
+
+		# Gera estrutura da árvore nível a nível fazendo as ramificações com ganho de informação
+		self.hist_memory = 0
+		if self.n_threads > 1:
+			with ThreadPoolExecutor(max_workers = self.n_threads) as self.executor:
+				self.build()
+			self.executor = None
+		else:
+			self.build()
+
+		# Converte para representação compacta e libera os dados usados no treino
+		self.flatten()
+		self.tree = {}
+		self.root = 0
+		self.boot_train_set = None
+		self.weights = None
+		self.index = None
+		self.rng = None
+
+
+	def flatten(self):
+		"""
+		Converte a árvore em dicionário (nodos com nomes, entradas e atributos) para vetores
+		planos indexados pelo número do nodo, percorrendo-a em largura a partir da raíz.
+		"""
+		target_codes = self.attr_info[self.target_attr]['codes']
+		mode_code = target_codes[f"{self.target_mode}"]
+
+		feature, threshold, child_start, children, value, info_gain = [], [], [], [], [], []
+
+		names = [self.root]
+		i = 0
+		while i < len(names):
+			node = self.tree[names[i]]
+
+			# Folha: guarda somente a classe predita
+			if not node['branches']:
+				feature.append(-1)
+				threshold.append(np.nan)
+				child_start.append(-1)
+				value.append(target_codes[node['label']])
+				info_gain.append(0.0)
+			else:
+				attr_info = self.attr_info[node['label']]
+				feature.append(attr_info['index'])
+				child_start.append(len(children))
+				value.append(mode_code)
+				info_gain.append(node['info_gain'] or 0.0)
+
+				# Filhos em ordem fixa: [menor_igual, maior] ou um por código do atributo categórico
+				# (valores sem entradas no nodo não têm filho: -1, e a predição é a do próprio nodo)
+				if attr_info['is_numeric']:
+					threshold.append(node['threshold'])
+					branches = [node['branches']['Menor_Igual'], node['branches']['Maior']]
+				else:
+					threshold.append(np.nan)
+					branches = [node['branches'].get(attr_value) for attr_value in attr_info['values']]
+
+				# Valores categóricos agrupados (Extra-Trees) apontam para o mesmo filho
+				positions = {}
+				for branch in branches:
+					if branch is None:
+						children.append(-1)
+						continue
+					if branch not in positions:
+						positions[branch] = len(names)
+						names.append(branch)
+					children.append(positions[branch])
 
-		# Gera estrutura da árvore recursivamente fazendo as ramificações com ganho de informação
-		self.branch_out(self.tree[self.root], self.root, height = 1)
+			i += 1
+
+		self.feature = np.array(feature, dtype=np.int32)
+		self.threshold = np.array(threshold, dtype=np.float64)
+		self.child_start = np.array(child_start, dtype=np.int32)
+		self.children = np.array(children, dtype=np.int32)
+		self.value = np.array(value, dtype=np.int32)
+		self.info_gain = np.array(info_gain, dtype=np.float64)
+
+
+	def build(self):
+		"""
+		Gera a árvore nível a nível (em largura), sem recursão. A cada nível, os histogramas
+		de todos os nodos da fronteira são calculados juntos e os nodos que ramificam formam
+		a fronteira do próximo nível.
+		"""
+		frontier = [self.root]
+		height = 1
+		while frontier:
+			frontier = self.branch_level(frontier, height)
+			height += 1
+
+
+	def branch_level(self, frontier, height):
+		""" Faz as ramificações de todos os nodos de um nível. Retorna nomes dos nodos do próximo nível. """
+		nodes = [self.tree[node_name] for node_name in frontier]
+
+		# Nodos recebem os histogramas herdados do pai (calculados ou obtidos por subtração)
+		self.inherit_histograms(nodes)
+
+		# Verifica critérios de parada e amostra atributos de cada nodo
+		branching = []
+		for node_name, node in zip(frontier, nodes):
+			# Conta entradas de cada classe do atributo-alvo uma única vez: a contagem é usada para os
+			# critérios de parada, para a classe majoritária da folha e para a entropia do alvo
+			class_counts = self.get_class_counts(node)
+
+			# Verifica critérios de parada
+			if self.stop_branching(node, class_counts, height):
+				node['hists'] = None
+				continue
+
+			branching.append((node_name, node, class_counts, self.sample_attrs(node['attrs'])))
+
+		# Nodos grandes (sem histogramas herdados) tentam decidir a divisão numa subamostra
+		estimated = {}
+		if self.subsample_above is not None and not self.extra_trees:
+			for node_name, node, _, sampled_attrs in branching:
+				if len(node['entries']) > self.subsample_above and not node['hists']:
+					estimate = self.estimate_split(node, sampled_attrs)
+					if estimate is not None:
+						estimated[node_name] = estimate
+
+		# Histogramas (faixa x classe) que faltam dos atributos amostrados, de todos os nodos juntos
+		self.fill_histograms([(node, {self.attr_info[attr]['index'] for attr in sampled_attrs})
+									 for node_name, node, _, sampled_attrs in branching
+									 if node_name not in estimated])
+		self.hist_memory = 0
+
+		next_frontier = []
+		for node_name, node, class_counts, sampled_attrs in branching:
+			# Calcula entropia do atributo-alvo
+			target_entropy = DecisionTree.get_target_entropy(class_counts)
+
+			# Decide próximo atributo (e divisão) pelo ganho de informação
+			if node_name in estimated:
+				next_attr, info_gain, split = estimated[node_name]
+			elif self.extra_trees:
+				next_attr, info_gain, split = self.get_random_split(sampled_attrs, node['hists'], target_entropy)
+			else:
+				next_attr, info_gain, split = self.get_next_attr(sampled_attrs, node['hists'], target_entropy,
+																				 len(node['entries']))
 
+			# Nenhum atributo amostrado consegue dividir as entradas (ou a árvore chegou no número
+			# máximo de nodos): nodo vira folha
+			if next_attr is None or not self.has_room(node, next_attr, split):
+				prediction = self.classes[class_counts.argmax()]
+				node['label'] = prediction
+				node['print'] = prediction
+				node['hists'] = None
+				continue
 
-	def branch_out(self, node, node_name, height):
-		""" Recursivamente faz ramificações na estrutura da árvore """
+			next_frontier.extend(self.split_node(node, node_name, next_attr, info_gain, split))
 
-		# Pega todos os valores do atributo-alvo para testar critério de parada e calcular entropia
-		target_values = []
-		for values in node['entries']:
-			target_values.append(values[-1])
+		return next_frontier
 
-		# Verifica critérios de parada da recursão
-		if self.stop_branching(node, target_values, height):
-			return
 
-		# Calcula entropia do atributo-alvo
-		target_entropy = DecisionTree.get_target_entropy(target_values)
+	def has_room(self, node, attr, split):
+		""" Verifica se os filhos da divisão pelo atributo cabem no número máximo de nodos da árvore """
+		if self.max_nodes is None:
+			return True
+		if split is not None:
+			n_sons = 2
+		else:
+			# Um filho por valor categórico presente nas entradas do nodo (contados nas entradas se
+			# o nodo não tem o histograma, quando a divisão foi estimada numa subamostra)
+			attr_i = self.attr_info[attr]['index']
+			if attr_i in node['hists']:
+				n_sons = np.count_nonzero(node['hists'][attr_i].sum(axis=1))
+			else:
+				n_sons = np.count_nonzero(np.bincount(self.dataset.bins[attr_i][node['entries']]))
+		return len(self.tree) + n_sons <= self.max_nodes
 
-		# Amostragem dos atributos
-		sampled_attrs = self.sample_attrs(node['attrs'])
 
-		# Decide próximo atributo pelo ganho de informação
-		next_attr, info_gain = self.get_next_attr(sampled_attrs, node['entries'], target_entropy)
+	def split_node(self, node, node_name, next_attr, info_gain, split):
+		"""
+		Divide o nodo pelo atributo escolhido, criando os filhos. A divisão 'split' é a faixa
+		limite se o atributo é numérico; se é categórico, é None (um filho por valor) ou o
+		subconjunto de códigos do primeiro de dois filhos (Extra-Trees). Retorna nomes dos filhos.
+		"""
 
 		# Coloca nome do atributo que tem maior ganho de informação no 'label' do nodo
 		node['label'] = next_attr
 		# Coloca ganho de informação do novo nodo
 		node['info_gain'] = info_gain
 
-		# Recursivamente ramifica para próximo nodo: ------------------------------
+		# Cria nodos filhos: ------------------------------------------------------
+
+		attr_i = self.attr_info[next_attr]['index']
+		attrs = [attr for attr in node['attrs'] if attr != next_attr]
+
+		# Particiona as entradas do nodo no lugar, agrupando as de cada filho
+		ranges = self.partition(node['start'], node['end'], attr_i, split)
 
-		# Se for numérico, abre ramos de menores ou iguais e de maiores
+		# Se for numérico, abre ramos de menores ou iguais e de maiores que o limite da faixa
 		if self.attr_info[next_attr]['is_numeric']:
-			# Altera informação de 'print' e média do nodo
-			attr_i = self.attr_info[next_attr]['index']
-			avg_value = DecisionTree.get_attr_avg(attr_i, node['entries'])
-			node['print'] = f"Attr {next_attr} ({avg_value:.2f})"
-			node['avg'] = avg_value
+			# Altera informação de 'print' e limiar do nodo
+			threshold = float(self.dataset.bin_edges[attr_i][split])
+			node['print'] = f"Attr {next_attr} ({threshold:.2f})"
+			node['threshold'] = threshold
 			# Cria novo nodo para situação 'menor ou igual' e 'maior'
-			for attr_value in ['Menor_Igual', 'Maior']:
-				new_node_name = node_name + f"_{attr_value}_{avg_value:.2f}"
-				attrs = [attr for attr in node['attrs'] if attr != next_attr]
-				if attr_value == 'Menor_Igual':
-					new_entries = DecisionTree.get_less_equal_entries(avg_value, attr_i, node['entries'])
-				else:
-					new_entries = DecisionTree.get_bigger_entries(avg_value, attr_i, node['entries'])
-				self.create_node(new_node_name, attrs, new_entries)
+			for attr_value, (start, end) in zip(['Menor_Igual', 'Maior'], ranges):
+				new_node_name = node_name + f"_{attr_value}_{threshold:.2f}"
+				self.create_node(new_node_name, attrs, start, end)
 
 				# Cria branch do atributo de maior ganho de informação a partir do nodo atual
 				node['branches'][attr_value] = new_node_name
-				# Recursão para o nodo criado
-				self.branch_out(self.tree[new_node_name], new_node_name, height+1)
 
-		# Se for categórico, abre ramo para cada categoria (cada valor possível do atributo)
+		# Se for divisão categórica em subconjuntos, abre um ramo para os valores do subconjunto e
+		# outro para os demais valores presentes nas entradas do nodo
+		elif split is not None:
+			node['print'] = next_attr
+			attr_values = self.attr_info[next_attr]['values']
+			hist = node['hists'][attr_i]
+			groups = [list(split), [code for code in np.flatnonzero(hist.sum(axis=1)) if code not in split]]
+			for group, (start, end) in zip(groups, ranges):
+				new_node_name = node_name + "_" + "|".join(attr_values[code] for code in group)
+				self.create_node(new_node_name, attrs, start, end)
+
+				# Todos os valores do grupo levam ao mesmo filho
+				for code in group:
+					node['branches'][attr_values[code]] = new_node_name
+
+		# Se for categórico, abre ramo para cada categoria presente nas entradas do nodo (valores
+		# sem entradas não têm filho e são classificados pelo valor padrão do nodo)
 		else:
 			# Altera informação de 'print' do nodo
 			node['print'] = next_attr
-			# Cria novo nodo para cada um desses valores possíveis do atributo com maior ganho
-			attr_values = self.attr_info[next_attr]['value_set']
-			for attr_value in attr_values:
+			# Cria novo nodo para cada um desses valores do atributo com maior ganho
+			attr_values = self.attr_info[next_attr]['values']
+			for attr_value, (start, end) in zip(attr_values, ranges):
+				if start == end:
+					continue
 				new_node_name = node_name + f"_{attr_value}"
-				attrs = [attr for attr in node['attrs'] if attr != next_attr]
-				new_entries = self.get_entries_with_value(next_attr, attr_value, node['entries'])
-				self.create_node(new_node_name, attrs, new_entries)
+				self.create_node(new_node_name, attrs, start, end)
 
 				# Cria branch do atributo de maior ganho de informação a partir do nodo atual
 				node['branches'][attr_value] = new_node_name
 
-				# Recursão para o nodo criado
-				self.branch_out(self.tree[new_node_name], new_node_name, height+1)
+		# Filhos herdam os histogramas do pai no próximo nível e o pai libera os seus
+		son_names = list(dict.fromkeys(node['branches'].values()))
+		self.plan_inheritance(node, [self.tree[son] for son in son_names], attr_i)
+		node['hists'] = None
 
+		return son_names
 
-	def stop_branching(self, node, target_values, height):
+
+	def stop_branching(self, node, class_counts, height):
 		""" Critérios de parada para ramificação da árvore de decisão """
 
 		# Não tem mais entradas de dados pra calcular ganho de informação
-		if len(node['entries']) == 0:
+		if class_counts.sum() == 0:
 			node['label'] = f"{self.target_mode}"   # Folha é a moda de y no dataset completo
 			node['print'] = f"{self.target_mode}"   # Folha é a moda de y no dataset completo
 			return True
@@ -199,14 +534,14 @@ class DecisionTree:
 		# Não tem mais atributos para ramificar
 		if len(node['attrs']) == 0:
 			# Nó folha vai ser o valor de y mais frequente dos valores que restaram
-			prediction = max(set(target_values), key=target_values.count)
+			prediction = self.classes[class_counts.argmax()]
 			node['label'] = prediction
 			node['print'] = prediction
 			return True
 
 		# Contém apenas um valor nos atributos-alvo
-		if len(set(target_values)) == 1:
-			prediction = target_values[0]
+		if np.count_nonzero(class_counts) == 1:
+			prediction = self.classes[class_counts.argmax()]
 			node['label'] = prediction
 			node['print'] = prediction
 			return True
@@ -215,7 +550,7 @@ class DecisionTree:
 		if self.max_height:
 			if height == self.max_height:
 				# Valor predito é aquele mais frequente dentre os valores de y que chegaram no nodo
-				prediction = max(set(target_values), key=target_values.count)
+				prediction = self.classes[class_counts.argmax()]
 				node['label'] = prediction
 				node['print'] = prediction
 				return True
@@ -236,148 +571,289 @@ class DecisionTree:
 		# Escolhe aleatoriamente 'm' atributos
 		sampled_attrs = []
 		for _ in range(m):
-			sampled_attrs.append(choice(attrs_list))
+			sampled_attrs.append(self.rng.choice(attrs_list))
 
 		return sampled_attrs
 
 
-	def get_next_attr(self, attrs, entries, target_entropy):
-		""" Decide próximo atributo baseado na entropia e ganho de informação """
+	def fill_histograms(self, requests):
+		"""
+		Calcula os histogramas (faixa x classe) pedidos em 'requests', lista de (nodo, índices
+		dos atributos), que o nodo ainda não tem. Para cada atributo, os histogramas de todos os
+		nodos que precisam dele saem de uma única contagem sobre as entradas desses nodos
+		(com bootstrap, cada entrada conta o número de vezes que foi sorteada).
+		"""
+		n_classes = len(self.classes)
+
+		# Nodos que precisam de cada atributo
+		needs = {}
+		for node, attr_indexes in requests:
+			for attr_i in attr_indexes:
+				if attr_i not in node['hists']:
+					needs.setdefault(attr_i, []).append(node)
+
+		# Atributos pedidos pelo mesmo conjunto de nodos compartilham as entradas reunidas
+		groups = {}
+		for attr_i, nodes in needs.items():
+			groups.setdefault(tuple(id(node) for node in nodes), (nodes, []))[1].append(attr_i)
+
+		for nodes, attr_indexes in groups.values():
+			entries = np.concatenate([node['entries'] for node in nodes])
+			slots = np.repeat(np.arange(len(nodes)), [len(node['entries']) for node in nodes])
+			weights = self.weights[entries] if self.weights is not None else None
+			targets = self.dataset.target[entries]
+
+			def attr_histograms(attr_i):
+				# Chave única para cada (nodo, faixa, classe)
+				n_bins = self.dataset.n_bins[attr_i]
+				keys = (slots * n_bins + self.dataset.bins[attr_i][entries]) * n_classes + targets
+				hists = np.bincount(keys, weights, minlength=len(nodes) * n_bins * n_classes)
+				return hists.astype(np.int64).reshape(len(nodes), n_bins, n_classes)
+
+			for attr_i, hists in zip(attr_indexes, self.map_attrs(attr_histograms, attr_indexes, len(entries))):
+				for node, hist in zip(nodes, hists):
+					node['hists'][attr_i] = hist
+
+
+	def map_attrs(self, function, attrs, n_entries):
+		"""
+		Aplica 'function' a cada atributo e retorna os resultados na ordem dos atributos. Com
+		mais de uma thread e ao menos 'parallel_min_entries' entradas, os atributos são avaliados
+		em paralelo (as operações do numpy sobre vetores grandes liberam o GIL).
+		"""
+		if self.executor is None or n_entries < self.parallel_min_entries or len(attrs) < 2:
+			return [function(attr) for attr in attrs]
+		return list(self.executor.map(function, attrs))
+
+
+	def plan_inheritance(self, node, sons, split_attr_i):
+		"""
+		Prepara a herança dos histogramas do pai pelos filhos, feita no próximo nível em
+		'inherit_histograms': somente os filhos menores terão seus histogramas calculados a
+		partir das entradas; o do maior filho será o do pai menos os dos irmãos. Se os
+		histogramas guardados no nível passarem do limite de memória, os filhos não herdam.
+		"""
+		hists = {attr_i: hist for attr_i, hist in node['hists'].items() if attr_i != split_attr_i}
+		size = sum(hist.nbytes for hist in hists.values())
+		if self.max_hist_memory is not None and self.hist_memory + size > self.max_hist_memory:
+			return
+		self.hist_memory += size
+
+		biggest = max(range(len(sons)), key=lambda i: len(sons[i]['entries']))
+		for i, son in enumerate(sons):
+			if i == biggest:
+				son['inherit'] = (hists, sons[:i] + sons[i+1:])
+			else:
+				son['inherit'] = (hists, None)
+
+
+	def inherit_histograms(self, nodes):
+		""" Nodos do nível recebem os histogramas herdados do pai (ver 'plan_inheritance') """
+		inheriting = [node for node in nodes if node.get('inherit')]
 
-		# Calculo da entropia necessita todos os valores possíveis do atributo-alvo
-		target_values = self.attr_info[self.target_attr]['value_set']
+		# Filhos menores: histogramas calculados juntos a partir das entradas
+		self.fill_histograms([(node, node['inherit'][0]) for node in inheriting
+									 if node['inherit'][1] is None])
+
+		# Maior filho: histograma do pai menos os dos irmãos
+		for node in inheriting:
+			parent_hists, siblings = node.pop('inherit')
+			if siblings is None:
+				continue
+			for attr_i, hist in parent_hists.items():
+				hist = hist.copy()
+				for sibling in siblings:
+					hist -= sibling['hists'][attr_i]
+				node['hists'][attr_i] = hist
+
+
+	def get_next_attr(self, attrs, hists, target_entropy, n_entries = 0):
+		"""
+		Decide próximo atributo baseado na entropia e ganho de informação. Para atributos
+		numéricos, todo limite entre faixas é candidato. Retorna atributo, ganho e faixa limite.
+		"""
 
 		# Para cada atributo disponível para ramificar, calcula o ganho de informação
-		next_attr = {'attr': None, 'info_gain': -1}
+		next_attr = {'attr': None, 'info_gain': -1, 'bin': None}
+		for attr, info_gain, split_bin in self.get_attr_gains(attrs, hists, target_entropy, n_entries):
+			# Verifica se ganho de informação é maior do que o atributo com maior ganho no momento
+			if info_gain > next_attr['info_gain']:
+				next_attr['attr'] = attr
+				next_attr['info_gain'] = info_gain
+				next_attr['bin'] = split_bin
+
+		return next_attr['attr'], next_attr['info_gain'], next_attr['bin']  # Atributo com maior ganho de informação
+
+
+	def get_attr_gains(self, attrs, hists, target_entropy, n_entries = 0):
+		"""
+		Retorna lista de (atributo, ganho de informação, faixa limite) dos atributos que dividem
+		as entradas, na ordem de 'attrs'. Em nodos com muitas entradas, os atributos são
+		avaliados em paralelo ('map_attrs').
+		"""
+
+		# Calcula a entropia de cada atributo disponível para as entradas de dados do nodo
+		def attr_entropy(attr):
+			# Pega histograma do atributo nas entradas do nodo
+			hist = hists[self.attr_info[attr]['index']]
+			if self.attr_info[attr]['is_numeric']:
+				return DecisionTree.get_numerical_entropy(hist)
+			return DecisionTree.get_categorical_entropy(hist), None
+
+		gains = []
+		for attr, (entropy, split_bin) in zip(attrs, self.map_attrs(attr_entropy, attrs, n_entries)):
+			# Atributo numérico com um único valor no nodo não divide as entradas
+			if entropy is not None:
+				gains.append((attr, DecisionTree.info_gain(target_entropy, entropy), split_bin))
+		return gains
+
+
+	def estimate_split(self, node, attrs):
+		"""
+		Estima a melhor divisão de um nodo grande numa subamostra aleatória de suas entradas.
+		A estimativa é aceita se a diferença de ganho entre o melhor e o segundo melhor atributo
+		passa do limite de Hoeffding: sqrt(R² ln(1/delta) / 2m), com R = log2(número de classes)
+		e m o tamanho da subamostra. Retorna (atributo, ganho, divisão) ou None, quando o nodo
+		deve avaliar todas as entradas.
+		"""
+		entries = node['entries']
+		m = min(self.subsample_size, len(entries))
+		sample = np.random.default_rng(self.rng.getrandbits(64)).choice(entries, m, replace=False)
+
+		# Histogramas e entropia do alvo na subamostra
+		sample_node = {'entries': sample, 'hists': {}}
+		self.fill_histograms([(sample_node, {self.attr_info[attr]['index'] for attr in attrs})])
+		class_counts = next(iter(sample_node['hists'].values())).sum(axis=0)
+		target_entropy = DecisionTree.get_target_entropy(class_counts)
+
+		gains = self.get_attr_gains(attrs, sample_node['hists'], target_entropy, m)
+		if not gains:
+			return None
+
+		# Melhor atributo (o primeiro, em caso de empate) e segundo melhor ganho de outro atributo
+		best = max(gains, key=lambda gain: gain[1])
+		second = max([gain[1] for gain in gains if gain[0] != best[0]], default=None)
+
+		epsilon = sqrt(log2(len(self.classes)) ** 2 * log(1 / self.subsample_delta) / (2 * m))
+		if second is not None and best[1] - second <= epsilon:
+			return None
+
+		return best
+
+
+	def get_random_split(self, attrs, hists, target_entropy):
+		"""
+		Escolha da divisão no modo Extra-Trees: para cada atributo, sorteia uma única divisão
+		(limiar uniforme entre o menor e o maior valor do nodo, se numérico, ou subconjunto
+		aleatório dos valores presentes, se categórico) e fica com a de maior ganho de informação.
+		Retorna atributo, ganho e divisão (faixa limite ou códigos do subconjunto).
+		"""
+		next_attr = {'attr': None, 'info_gain': -1, 'split': None}
 		for attr in attrs:
-			# Pega metainformação do atributo
 			attr_i = self.attr_info[attr]['index']
-			attr_values = self.attr_info[attr]['value_set']
+			hist = hists[attr_i]
+			present = np.flatnonzero(hist.sum(axis=1))
+
+			# Atributo com um único valor no nodo não divide as entradas
+			if len(present) < 2:
+				continue
 
-			# Calcula a entropia do atributo para as entradas de dados disponíveis no nodo
 			if self.attr_info[attr]['is_numeric']:
-				attr_entropy = DecisionTree.get_numerical_entropy(attr_i,
-																				  target_values,
-																				  entries)
+				# Limiar sorteado é convertido para a última faixa cujo limite superior não o passa
+				edges = self.dataset.bin_edges[attr_i]
+				threshold = self.rng.uniform(edges[present[0]], edges[present[-1]])
+				split = int(np.searchsorted(edges, threshold, side='right')) - 1
+				split = min(max(split, int(present[0])), int(present[-1]) - 1)
+				left = hist[:split+1].sum(axis=0)
 			else:
-				attr_entropy = DecisionTree.get_categorical_entropy(attr_i,
-																					 attr_values,
-																					 target_values,
-																					 entries)
+				# Subconjunto sorteado com ao menos um valor presente de cada lado
+				codes = present.tolist()
+				self.rng.shuffle(codes)
+				split = tuple(sorted(codes[:self.rng.randint(1, len(codes) - 1)]))
+				left = hist[list(split)].sum(axis=0)
+
+			split_counts = np.stack([left, hist.sum(axis=0) - left])
+			totals = split_counts.sum(axis=1)
+			attr_entropy = float((totals * DecisionTree.get_entropies(split_counts)).sum() / totals.sum())
 
-			# Verifica se ganho de informação é maior do que o atributo com maior ganho no momento
 			info_gain = DecisionTree.info_gain(target_entropy, attr_entropy)
 			if info_gain > next_attr['info_gain']:
 				next_attr['attr'] = attr
 				next_attr['info_gain'] = info_gain
+				next_attr['split'] = split
+
+		return next_attr['attr'], next_attr['info_gain'], next_attr['split']
 
-		return next_attr['attr'], next_attr['info_gain']  # Atributo com maior ganho de informação
+
+	def get_class_counts(self, node):
+		"""
+		Retorna vetor com a quantidade de entradas de cada classe no nodo. Se o nodo herdou
+		algum histograma do pai, a contagem é a soma das suas faixas; senão, conta as entradas.
+		"""
+		for hist in (node['hists'] or {}).values():
+			return hist.sum(axis=0)
+
+		entries = node['entries']
+		weights = self.weights[entries] if self.weights is not None else None
+		counts = np.bincount(self.dataset.target[entries], weights, minlength=len(self.classes))
+		return counts.astype(np.int64)
 
 
 	@staticmethod
-	def get_target_entropy(target_values):
-		""" Calcula a entropia dos atributos-alvo y """
+	def get_target_entropy(class_counts):
+		""" Calcula a entropia dos atributos-alvo y a partir da contagem de cada classe """
+		total = int(class_counts.sum())
 		entropy = 0
-		for value in set(target_values):
-			p = target_values.count(value) / len(target_values)
-			entropy += -p*log2(p)
+		for count in class_counts.tolist():
+			if count:
+				p = count / total
+				entropy += -p*log2(p)
 		return entropy
 
 
 	@staticmethod
-	def get_categorical_entropy(attr_index, attr_values, target_values, entries):
-		""" Calcula a entropia de um atributo categórico do vetor X """
-
-		# Preenche estrutura que associa cada valor possível do atributo X aos valores possíveis do alvo
-		# {
-		#   'Ensolarado': {'Sim': 0, 'Não': 0},
-		#   'Nublado':    {'Sim': 0, 'Não': 0},
-		#   'Chuvoso':    {'Sim': 0, 'Não': 0},
-		# }
-		amounts = {}
-		for attr_value in attr_values:
-			amounts[attr_value] = {}
-			for target_value in target_values:
-				amounts[attr_value][target_value] = 0
-
-		# Conta cada caso do atributo-alvo para cada valor possível do atributo
-		for entry in entries:
-			attr_value = entry[attr_index]
-			target_value = entry[-1]
-			amounts[attr_value][target_value] += 1
-
-		# Faz calculo da entropia para cada valor possível do atributo X
-		entropy_values = []
-		for attr_value in attr_values:
-			total = 0
-			for value in amounts[attr_value].values():
-				total += value
-
-			entropy = 0
-			for target_value in target_values:
-				if amounts[attr_value][target_value] != 0:
-					p = amounts[attr_value][target_value] / total
-					entropy += -p*log2(p)
-
-			entropy_values.append([entropy, total])
-
-		# Calcula entropia média da entropia de cada valor possível do atributo X
-		entropy_avg = 0
-		for entropy, total in entropy_values:
-			entropy_avg += (total/len(entries)) * entropy
-
-		return entropy_avg    # Entropia média
+	def get_entropies(counts):
+		""" Calcula a entropia de cada linha de uma matriz de contagens (linha x classe) """
+		totals = counts.sum(axis=-1, keepdims=True)
+		p = counts / np.maximum(totals, 1)
+		log_p = np.log2(p, out=np.zeros_like(p), where=p > 0)
+		return -(p * log_p).sum(axis=-1)
 
 
 	@staticmethod
-	def get_numerical_entropy(attr_index, target_values, entries):
-		""" Calcula entropia de um atributo numérico do vetor X"""
-
-		# Pega valor médio do atributo para o conjunto de dados que chegou naquele nodo
-		avg_attr_value = DecisionTree.get_attr_avg(attr_index, entries)
-
-		# Preenche estrutura que associa cada categoria numérica em relação à média a um valor possível do atributo-alvo
-		# {
-		#     'Menor_Igual': {'Type 1': 0, 'Type 2': 0, 'Type 3': 0}
-		#     'Maior'      : {'Type 1': 0, 'Type 2': 0, 'Type 3': 0}
-		# }
-		amounts = {}
-		amounts['Menor_Igual'] = {}
-		amounts['Maior']       = {}
-		for target_value in target_values:
-			amounts['Menor_Igual'][target_value] = 0
-			amounts['Maior'][target_value]       = 0
-
-		# Conta cada caso das entradas, preenchendo a estrutura definida acima
-		for entry in entries:
-			attr_value = float(entry[attr_index])
-			target_value = entry[-1]
-			if attr_value <= avg_attr_value:
-				amounts['Menor_Igual'][target_value] += 1
-			else:
-				amounts['Maior'][target_value] += 1
+	def get_categorical_entropy(hist):
+		"""
+		Calcula a entropia de um atributo categórico do vetor X a partir do seu histograma
+		(quantidade de entradas de cada classe para cada valor possível do atributo)
+		"""
+		totals = hist.sum(axis=1)
+		return float((totals * DecisionTree.get_entropies(hist)).sum() / totals.sum())    # Entropia média
+
 
-		# Faz calculo da entropia
-		entropy_values = []
-		for attr_value in ['Menor_Igual', 'Maior']:
-			total = 0
-			for value in amounts[attr_value].values():
-				total += value
+	@staticmethod
+	def get_numerical_entropy(hist):
+		"""
+		Calcula entropia de um atributo numérico do vetor X para cada limite entre faixas do
+		histograma (entradas até a faixa 'b' vs. demais) e retorna a menor e sua faixa limite
+		"""
 
-			entropy = 0
-			for target_value in target_values:
-				if amounts[attr_value][target_value] != 0:
-					p = amounts[attr_value][target_value] / total
-					entropy += -p*log2(p)
+		# Contagens de cada classe à esquerda (menor ou igual) e à direita (maior) de cada limite
+		left = np.cumsum(hist, axis=0)[:-1]
+		right = hist.sum(axis=0) - left
+		left_totals = left.sum(axis=1)
+		right_totals = right.sum(axis=1)
 
-			entropy_values.append([entropy, total])
+		# Somente limites que deixam entradas dos dois lados são candidatos
+		candidates = np.flatnonzero((left_totals > 0) & (right_totals > 0))
+		if len(candidates) == 0:
+			return None, None
 
-		# Calcula entropia média da entropia de cada categoria numérica (menor_igual ou maior) do atributo X
-		entropy_avg = 0
-		for entropy, total in entropy_values:
-			entropy_avg += (total/len(entries)) * entropy
+		# Entropia média dos dois lados para cada limite candidato
+		entropies = (left_totals * DecisionTree.get_entropies(left) +
+						 right_totals * DecisionTree.get_entropies(right)) / (left_totals + right_totals)
 
-		return entropy_avg   #Entropia média
+		split_bin = candidates[entropies[candidates].argmin()]
+		return float(entropies[split_bin]), int(split_bin)   # Menor entropia média e faixa limite
 
 
 	@staticmethod
@@ -386,75 +862,108 @@ class DecisionTree:
 		return target_entropy - attr_entropy
 
 
-	def get_entries_with_value(self, attr, value, entries):
-		""" Pega entradas que possuem certo valor em um atributo """
-
-		# Pega metadados do atributo para acessar os dados
-		attr_i = self.attr_info[attr]['index']
-
-		# Para cada entrada, pega somente aquelas com o valor do atributo passado como argumento
-		entries_with_value = []
-		for entry in entries:
-			if entry[attr_i] == value:
-				entries_with_value.append(entry)
-		return entries_with_value
-
+	def partition(self, start, end, attr_i, split = None):
+		"""
+		Particiona no lugar o trecho [start, end) de 'self.index', como no quicksort: se o
+		atributo é numérico, entradas com faixa menor ou igual a 'split' vêm antes das
+		maiores; se é categórico, entradas ficam agrupadas por código (ou, se 'split' é um
+		subconjunto de códigos, as do subconjunto vêm antes das demais). Retorna o trecho
+		(start, end) de cada filho, na ordem dos ramos.
+		"""
+		segment = self.index[start:end]
+		attr_bins = self.dataset.bins[attr_i][segment]
+
+		if isinstance(split, tuple):
+			keys = (~np.isin(attr_bins, split)).astype(np.uint8)
+			n_keys = 2
+		elif split is not None:
+			keys = (attr_bins > split).astype(np.uint8)
+			n_keys = 2
+		else:
+			keys = attr_bins
+			n_keys = self.dataset.n_bins[attr_i]
 
-	@staticmethod
-	def get_less_equal_entries(value, attr_i, entries):
-		""" Pega todas as instânias com valor de certo atributo menor ou igual que um valor """
-		new_entries = []
-		for entry in entries:
-			if float(entry[attr_i]) <= value:
-				new_entries.append(entry)
-		return new_entries
+		# Ordenação estável pela chave mantém a ordem relativa das entradas dentro de cada filho
+		segment[:] = segment[np.argsort(keys, kind='stable')]
 
+		bounds = start + np.concatenate(([0], np.cumsum(np.bincount(keys, minlength=n_keys))))
+		return [(int(bounds[i]), int(bounds[i+1])) for i in range(n_keys)]
 
-	@staticmethod
-	def get_bigger_entries(value, attr_i, entries):
-		""" Pega todas as instânias com valor de certo atributo maior que um valor """
-		new_entries = []
-		for entry in entries:
-			if float(entry[attr_i]) > value:
-				new_entries.append(entry)
-		return new_entries
 
+	def fit(self, instance):
+		""" Faz classificação de nova instância percorrendo a árvore """
+		return self.classes[self.fit_code(instance)]
 
-	@staticmethod
-	def get_attr_avg(attr_index, entries):
-		""" Retorna valor médio para atributo com certo índice nos dados """
-		attr_values = []
-		for entry in entries:
-			attr_values.append(float(entry[attr_index]))
 
-		return mean(attr_values)
+	def get_fit_tables(self):
+		"""
+		Listas Python dos vetores de nodos e, para cada atributo, None se numérico ou a
+		codificação dos valores se categórico. Percorrer listas é bem mais rápido que indexar
+		vetores numpy elemento a elemento. Refeitas quando os vetores são trocados (ex.: 'load').
+		Guardadas junto com o vetor 'feature' de onde vieram; árvores que compartilham vetores
+		de nodos podem compartilhar as listas (ver 'Ensemble.share_fit_tables').
+		"""
+		if self.fit_tables is None or self.fit_tables[0] is not self.feature:
+			attr_codes = [None if self.attr_info[header]['is_numeric'] else self.attr_info[header]['codes']
+							  for header in self.headers[:-1]]
+			self.fit_tables = (self.feature, (self.feature.tolist(), self.threshold.tolist(), self.child_start.tolist(),
+														 self.children.tolist(), self.value.tolist(), attr_codes))
+		return self.fit_tables[1]
 
 
-	def fit(self, instance):
-		""" Faz classificação de nova instância percorrendo a árvore """
+	def fit_code(self, instance):
+		""" Percorre a árvore com a instância e retorna o código da classe predita """
+		feature, threshold, child_start, children, value, attr_codes = self.get_fit_tables()
 
-		# Nodo inicial é o "Root"
-		node = self.tree[self.root]
-		value = node['label']
+		# Nodo inicial é a raíz
+		node = self.root
 
 		# Enquanto não chegou no nodo folha
-		while node['branches']:
-			# Pega valor do nodo (atributo ou resposta) na instância passada
-			attr_i = self.attr_info[value]['index']
-			attr_value =  instance[attr_i]
-
-			if self.attr_info[value]['is_numeric']:
-				if float(attr_value) <= node['avg']:
-					node = self.tree[node['branches']['Menor_Igual']]
-				else:
-					node = self.tree[node['branches']['Maior']]
+		attr_i = feature[node]
+		while attr_i != -1:
+			# Pega valor do atributo do nodo na instância passada
+			codes = attr_codes[attr_i]
+			if codes is None:
+				branch = 0 if float(instance[attr_i]) <= threshold[node] else 1
 			else:
-				# Agora que tem o valor, vai para o próximo nodo na árvore
-				node = self.tree[node['branches'][attr_value]]
-
-			value = node['label']
-
-		return value   # Resposta da classificação
+				# Valor categórico desconhecido: predição padrão do nodo
+				branch = codes.get(instance[attr_i], -1)
+				if branch == -1:
+					break
+
+			# Valor categórico sem filho: predição padrão do nodo
+			son = children[child_start[node] + branch]
+			if son == -1:
+				break
+
+			# Agora que tem o ramo, vai para o próximo nodo na árvore
+			node = son
+			attr_i = feature[node]
+
+		return value[node]   # Código da resposta da classificação
+
+
+	def predict_codes(self, matrix):
+		"""
+		Classifica todas as instâncias de uma matriz codificada ('Dataset.encode') de uma vez
+		(ver 'descend'). Retorna o código da classe predita de cada uma. Os vetores de 'descend'
+		são refeitos somente quando os vetores de nodos são trocados (ex.: 'load' e compactação).
+		"""
+		is_numeric, n_codes = self.dataset.attr_arrays()
+		if self.route_tables is None or self.route_tables[0] is not self.feature:
+			self.route_tables = (self.feature, route_arrays(self.feature, self.threshold, self.child_start, self.children,
+																			self.value, is_numeric, n_codes, len(self.classes)))
+		route, positions = self.route_tables[1]
+		values, codes, width = route_values(matrix, is_numeric)
+		nodes = descend(route, values, codes, np.arange(len(matrix)) * width,
+							 np.full(len(matrix), positions[self.root], dtype=np.intp))
+		return route[-1][nodes]
+
+
+	def predict_batch(self, rows):
+		""" Classifica uma lista de instâncias de uma vez. Retorna lista com as classes preditas. """
+		codes = self.predict_codes(self.dataset.encode(rows))
+		return [self.classes[code] for code in codes]
 
 
 	def fit_bootstrap(self, debug = False):
@@ -467,7 +976,8 @@ class DecisionTree:
 		errors = 0
 
 		# Faz 'fit' de cada instância do conjunto de teste do bootstrap
-		for instance in self.boot_test_set:
+		for i in self.boot_test_set:
+			instance = self.dataset.rows[i]
 			expected_prediction = instance[-1]
 			prediction = self.fit(instance)
 
@@ -486,105 +996,296 @@ class DecisionTree:
 
 
 	def print_tree(self):
-		""" Imprime árvore de decisão gerada no terminal """
+		""" Imprime árvore de decisão gerada no terminal (em profundidade, com pilha explícita) """
 		print("------------------ ÁRVORE INÍCIO ------------------")
-		self.recursive_print(self.tree[self.root])
+
+		stack = [(self.root, 0)]
+		while stack:
+			node, level = stack.pop()
+
+			# Imprime valor do nodo atual com seu nível de identação de acordo com sua profundidade
+			print("  " * level, end="")
+
+			# Testa se tem ganho de informação (folha) para não imprimir ganho de informação
+			if self.info_gain[node]:
+				print(f"{self.node_print(node)} [{self.info_gain[node]:.3f}]")
+			else:
+				print(f"{self.node_print(node)}")
+
+			# Filhos são empilhados em ordem inversa para serem impressos na ordem dos ramos
+			for branchLabel, son in reversed(self.node_branches(node)):
+				stack.append((son, level+1))
+
 		print("------------------- ÁRVORE FIM --------------------")
 
 
-	def recursive_print(self, node, level = 0):
-		""" Recursivamente imprime a árvore de decisão nodo a nodo """
+	def node_print(self, node):
+		""" Texto que representa o nodo: atributo (e limiar, se numérico) ou classe predita se folha """
+		if self.feature[node] == -1:
+			return self.classes[self.value[node]]
+
+		attr = self.headers[self.feature[node]]
+		if self.attr_info[attr]['is_numeric']:
+			return f"Attr {attr} ({self.threshold[node]:.2f})"
+		return attr
+
 
-		# Imprime valor do nodo atual com seu nível de identação de acordo com sua profundidade
-		for _ in range(level):
-			print("  ", end="")
+	def node_branches(self, node):
+		""" Lista de (rótulo do ramo, nodo filho) de um nodo (somente ramos com filho) """
+		return [("|".join(labels), son) for labels, son in self.branch_values(node)]
 
-		# Testa se tem ganho de informação (folha) para não imprimir ganho de informação
-		if node['info_gain']:
-			print(f"{node['print']} [{node['info_gain']:.3f}]")
+
+	def branch_values(self, node):
+		"""
+		Lista de (valores do ramo, nodo filho) de um nodo, somente ramos com filho. Valores
+		categóricos que levam ao mesmo filho (Extra-Trees) ficam juntos num único ramo.
+		"""
+		if self.feature[node] == -1:
+			return []
+
+		attr = self.headers[self.feature[node]]
+		if self.attr_info[attr]['is_numeric']:
+			labels = ['Menor_Igual', 'Maior']
 		else:
-			print(f"{node['print']}")
+			labels = self.attr_info[attr]['values']
 
-		# Recursivamente imprime os filhos do nodo
-		for branchLabel, son in node['branches'].items():
-			self.recursive_print(self.tree[son], level+1)
+		start = self.child_start[node]
+		sons = {}
+		for b, label in enumerate(labels):
+			son = int(self.children[start + b])
+			if son != -1:
+				sons.setdefault(son, []).append(label)
+		return [(son_labels, son) for son, son_labels in sons.items()]
 
 
 	def take_photo(self, filename):
-		""" Coloca em arquivo de saída a imagem da árvore """
+		"""
+		Coloca em arquivo de saída a imagem da árvore. Nodos e arestas são percorridos em
+		profundidade com pilha explícita (como 'print_tree'); cada nodo recebe o número da
+		ordem em que é visitado, para que nodos iguais tenham nomes diferentes na imagem.
+		"""
 		tree_img = gz.Digraph(format = 'png')
-		self.recursive_photo(self.tree[self.root], tree_img)
-		tree_img.render(f"../img/{filename}.gv")
 
+		stack = [(self.root, None, None)]   # (nodo, texto do pai, rótulo do ramo que leva ao nodo)
+		i = 0
+		while stack:
+			node, parent_str, branchLabel = stack.pop()
+
+			# Testa se tem ganho de informação (folha) para não imprimir ganho de informação
+			if self.info_gain[node]:
+				node_str = f"{i}. {self.node_print(node)}\n[{self.info_gain[node]:.3f}]"
+			else:
+				node_str = f"{i}. {self.node_print(node)}"
+			i += 1
 
-	def recursive_photo(self, node, tree_img, i = 0):
-		""" Recursivamente passa pela árvore, pegando os nodos e arestas para gerar imagem """
+			# Coloca aresta entre o pai e o nodo com o atributo que levou àquele nodo
+			if parent_str is not None:
+				tree_img.edge(parent_str, node_str, label=branchLabel)
 
-		# Coloca nodo na imagem final (testa se tem ganho de informação, isto é, se não é folha)
-		if node['info_gain']:
-			node_str = f"{i}. {node['print']}\n[{node['info_gain']:.3f}]"
-		else:
-			node_str = f"{i}. {node['print']}"
+			# Se nodo folha, coloca estilo diferente (cor e forma)
+			if self.feature[node] == -1:
+				tree_img.node(node_str, color = 'red', shape = 'box', fontcolor = 'red')
+			else:
+				tree_img.node(node_str)
 
+			# Filhos são empilhados em ordem inversa para serem visitados na ordem dos ramos
+			for branchLabel, son in reversed(self.node_branches(node)):
+				stack.append((son, node_str, branchLabel))
 
-		# Se nodo folha, coloca estilo diferente (cor e forma)
-		if not node['branches']:
-			tree_img.node(node_str, color = 'red', shape = 'box', fontcolor = 'red')
-		else:
-			tree_img.node(node_str)
+		tree_img.render(f"../img/{filename}.gv")
 
-		# Para cada filho
-		for branchLabel, son in node['branches'].items():
-			# Coloca aresta entre o nodo e seu filho com o atributo que levou àquele nodo filho
-			i += 1
 
-			# Testa se tem ganho de informação (folha) para não imprimir ganho de informação
-			if self.tree[son]['info_gain']:
-				son_str = f"{i}. {self.tree[son]['print']}\n[{self.tree[son]['info_gain']:.3f}]"
-			else:
-				son_str = f"{i}. {self.tree[son]['print']}"
 
-			tree_img.edge(node_str, son_str, label=branchLabel)
+def init_worker(description):
+	""" Acessa no processo os dados de treino da memória compartilhada (uma vez por processo) """
+	global _dataset
+	_dataset = Dataset.attach(description)
+
+
 
-			# Coloca também na imagem filhos do filho
-			i = self.recursive_photo(self.tree[son], tree_img, i)
+def train_tree(max_height, seed, data = None, extra_trees = False):
+	""" Treina uma árvore da floresta (sem 'data', sobre os dados compartilhados do processo) """
+	decision_tree = DecisionTree(max_height = max_height,
+										  has_sampling = True,
+										  has_bootstrap = True,
+										  seed = seed,
+										  extra_trees = extra_trees)
+	if data is not None:
+		decision_tree.train(data)
+		return decision_tree
 
-		return i    # Retorna variável de controle 'i' usada para não repetir nomes dos nodos
+	# No processo, a árvore volta sem os dados de treino (recolocados com 'attach')
+	decision_tree.train(_dataset)
+	decision_tree.dataset = None
+	decision_tree.attr_info = None
+	return decision_tree
 
 
 
 class Ensemble:
 	""" Ensemble de 'n' árvores de decisão (Floresta Aleatória) """
 
-	def __init__(self, ntree, max_height = None, id = 0):
+	def __init__(self, ntree, max_height = None, id = 0, n_jobs = 1, seed = None, extra_trees = False,
+					 cache_size = None):
 		self.number_of_trees = ntree   # Número de árvores da floresta
 		self.max_height = max_height   # Altura máxima de todas as árvores da floresta
 		self.ensemble_id = id          # Id para gerar pasta com imagens das árvores da floresta
+		self.n_jobs = n_jobs           # Número de processos que treinam as árvores
+		self.extra_trees = extra_trees # Booleano que indica se as árvores são Extra-Trees
+		# Semente da floresta (sorteada do estado global se não for passada)
+		self.seed = seed if seed is not None else random.getrandbits(64)
 		self.decision_trees = []       # Lista com as árvores
+		self.dataset = None            # Dados de treino em colunas (usados na estimativa 'Out of Bag')
+		self.version = 0               # Muda sempre que as árvores mudam (invalida o cache de 'fit')
+
+		# Cache LRU das predições de 'fit' (None ou 0 para desligado)
+		self.cache_size = cache_size   # Número máximo de instâncias no cache
+		self.cache = OrderedDict()     # Instância codificada -> predição, da menos à mais recente
+		self.cache_version = 0         # Versão da floresta das predições no cache
+		self.cache_hits = 0            # Predições encontradas no cache
+		self.cache_misses = 0          # Predições calculadas pelas árvores
+		self.cache_evictions = 0       # Predições descartadas por falta de espaço
+
+		# Versão da floresta quando as listas de 'fit' foram compartilhadas (ver 'share_fit_tables')
+		self.fit_tables_version = None
+
+		# Vetores de nodos de todas as árvores concatenados (ver 'node_pool')
+		self.pool = None               # Vetores e raízes das árvores
+		self.pool_trees = None         # Vetor 'feature' e raíz de cada árvore quando foram concatenados
 
 
 	def generate(self, data, get_tree_images = False):
-		""" Gera árvores para os dados (fold se for validação cruzada estratificada) """
-		for i in range(self.number_of_trees):
-			decision_tree = DecisionTree(max_height = self.max_height,
-												  has_sampling = True,
-												  has_bootstrap = True)
-			decision_tree.train(data)
+		"""
+		Gera as árvores para os dados (fold se for validação cruzada estratificada). Árvores de
+		uma geração anterior são descartadas: foram treinadas com outros dados. Para acrescentar
+		árvores com os mesmos dados, use 'grow'.
+		"""
+
+		# Dados são convertidos em colunas uma única vez e compartilhados por todas as árvores
+		if not isinstance(data, Dataset):
+			data = Dataset(data)
+		self.dataset = data
+
+		self.decision_trees = []
+		self.grow(self.number_of_trees, get_tree_images)
+
+
+	def grow(self, ntree, get_tree_images = False):
+		"""
+		Adiciona 'ntree' árvores à floresta já gerada (mesmos dados de treino). A semente de cada
+		árvore depende só da semente da floresta e da posição da árvore, então crescer uma floresta
+		aos poucos gera as mesmas árvores que gerá-la de uma vez (com qualquer 'n_jobs').
+		"""
+		first = len(self.decision_trees)
+		seeds = [Ensemble.tree_seed(self.seed, i) for i in range(first, first + ntree)]
+
+		if self.n_jobs == 1:
+			decision_trees = [train_tree(self.max_height, seed, self.dataset, self.extra_trees)
+									for seed in seeds]
+		else:
+			decision_trees = self.train_parallel(self.dataset, seeds)
 
+		for i, decision_tree in enumerate(decision_trees, first):
 			if get_tree_images:
 				decision_tree.take_photo(f"Ensemble_{self.ensemble_id}/tree_{i}")
 
 			self.decision_trees.append(decision_tree)
 
+		self.number_of_trees = len(self.decision_trees)
+		self.version += 1
 
-	def fit(self, instance):
-		""" Faz classificação de nova instância na floresta aleatória """
+
+	@staticmethod
+	def tree_seed(seed, i):
+		""" Semente da i-ésima árvore de uma floresta com semente 'seed' """
+		return int(np.random.SeedSequence(seed, spawn_key=(i,)).generate_state(1, np.uint64)[0])
+
+
+	def train_parallel(self, data, seeds):
+		"""
+		Treina as árvores em 'n_jobs' processos. Os dados ficam uma única vez em memória
+		compartilhada; somente as árvores treinadas (sem os dados) voltam dos processos.
+		"""
+		block, description = data.share()
+		try:
+			with ProcessPoolExecutor(max_workers = self.n_jobs,
+											 initializer = init_worker,
+											 initargs = (description,)) as executor:
+				decision_trees = list(executor.map(train_tree, [self.max_height] * len(seeds), seeds,
+															  [None] * len(seeds), [self.extra_trees] * len(seeds)))
+		finally:
+			block.close()
+			block.unlink()
+
+		for decision_tree in decision_trees:
+			decision_tree.attach(data)
+		return decision_trees
+
+
+	def fit(self, instance, ntree = None):
+		"""
+		Faz classificação de nova instância na floresta aleatória (ou nas 'ntree' primeiras
+		árvores). Com 'cache_size', instâncias repetidas são respondidas pelo cache LRU.
+		"""
+		if not self.cache_size:
+			return self.fit_trees(instance, ntree)
+
+		# Floresta mudou desde que as predições do cache foram calculadas
+		if self.cache_version != self.version:
+			self.cache.clear()
+			self.cache_version = self.version
+
+		key = (ntree, self.encode_key(instance))
+		if key in self.cache:
+			self.cache_hits += 1
+			self.cache.move_to_end(key)
+			return self.cache[key]
+
+		self.cache_misses += 1
+		prediction = self.fit_trees(instance, ntree)
+		self.cache[key] = prediction
+		while len(self.cache) > self.cache_size:
+			self.cache.popitem(last=False)   # Descarta a predição usada há mais tempo
+			self.cache_evictions += 1
+		return prediction
+
+
+	def encode_key(self, instance):
+		"""
+		Instância codificada como tupla (chave do cache): valor dos atributos numéricos e
+		código dos categóricos (-1 se desconhecido), como em 'Dataset.encode'.
+		"""
+		key = []
+		for header in self.dataset.headers[:-1]:
+			info = self.dataset.attr_info[header]
+			value = instance[info['index']]
+			key.append(float(value) if info['is_numeric'] else info['codes'].get(value, -1))
+		return tuple(key)
+
+
+	def cache_info(self):
+		""" Contadores e ocupação do cache de 'fit' """
+		return {'hits': self.cache_hits, 'misses': self.cache_misses, 'evictions': self.cache_evictions,
+				  'size': len(self.cache), 'max_size': self.cache_size}
+
+
+	def clear_cache(self):
+		""" Esvazia o cache de 'fit' e zera seus contadores """
+		self.cache.clear()
+		self.cache_hits = self.cache_misses = self.cache_evictions = 0
+
+
+	def fit_trees(self, instance, ntree = None):
+		""" Classifica a instância percorrendo as árvores (sem cache) """
+
+		if self.fit_tables_version != self.version:
+			self.share_fit_tables()
 
 		# Predições de todas as árvores da floresta
 		predictions = []
 
 		# Cada árvore faz sua predição
-		for decision_tree in self.decision_trees:
+		for decision_tree in self.decision_trees[:ntree]:
 			predictions.append(decision_tree.fit(instance))
 
 		# Combina todas as predições de cada árvore em uma única predição
@@ -592,6 +1293,249 @@ class Ensemble:
 		return prediction
 
 
+	def share_fit_tables(self):
+		"""
+		Árvores que compartilham vetores de nodos (floresta compactada ou carregada) passam a
+		compartilhar também as listas de 'fit_code', criadas uma única vez para cada conjunto de
+		vetores, ao invés de cada árvore copiar todos os nodos compartilhados.
+		"""
+		tables = {}   # Endereço dos vetores de nodos -> listas de 'fit_code'
+		for decision_tree in self.decision_trees:
+			address = decision_tree.feature.__array_interface__['data'][0]
+			if address not in tables:
+				tables[address] = decision_tree.get_fit_tables()
+			decision_tree.fit_tables = (decision_tree.feature, tables[address])
+		self.fit_tables_version = self.version
+
+
+	def node_pool(self):
+		"""
+		Vetores de nodos de todas as árvores concatenados (vetores compartilhados, de floresta
+		compactada, entram uma única vez), com os índices dos filhos ajustados e preparados para
+		'descend' ('route_arrays'), e a raíz de cada árvore neles. Refeitos somente quando as
+		árvores mudam.
+		"""
+		trees = [(decision_tree.feature, decision_tree.root) for decision_tree in self.decision_trees]
+		if self.pool_trees is not None and len(trees) == len(self.pool_trees) and \
+			all(feature is pool_feature and root == pool_root
+				 for (feature, root), (pool_feature, pool_root) in zip(trees, self.pool_trees)):
+			return self.pool
+
+		parts = {}   # Endereço dos vetores de nodos -> (árvore, início dos nodos e dos filhos)
+		roots = []
+		node_total = child_total = 0
+		for decision_tree in self.decision_trees:
+			address = decision_tree.feature.__array_interface__['data'][0]
+			if address not in parts:
+				parts[address] = (decision_tree, node_total, child_total)
+				node_total += len(decision_tree.feature)
+				child_total += len(decision_tree.children)
+			roots.append(parts[address][1] + decision_tree.root)
+
+		def concatenate(name, shift = None):
+			# Índices de nodos ('nodes') ou de filhos ('children') são deslocados pelo início da árvore
+			arrays = []
+			for decision_tree, node_start, child_start in parts.values():
+				array = getattr(decision_tree, name)
+				if shift is not None:
+					start = node_start if shift == 'nodes' else child_start
+					array = np.where(array != -1, array.astype(np.intp) + start, -1)
+				arrays.append(array)
+			return np.concatenate(arrays)
+
+		route, positions = route_arrays(concatenate('feature'), concatenate('threshold'),
+												  concatenate('child_start', 'children'), concatenate('children', 'nodes'),
+												  concatenate('value'), *self.dataset.attr_arrays(), len(self.dataset.classes))
+		self.pool = (route, positions[np.array(roots, dtype=np.intp)])
+		self.pool_trees = trees
+		return self.pool
+
+
+	def predict_codes(self, matrix):
+		"""
+		Classifica todas as instâncias de uma matriz codificada em todas as árvores de uma vez:
+		os pares (árvore, instância) descem juntos pelos vetores concatenados ('node_pool').
+		Retorna matriz (árvore x instância) com o código da classe predita.
+		"""
+		route, roots = self.node_pool()
+		values, codes, width = route_values(matrix, self.dataset.attr_arrays()[0])
+		offsets = np.tile(np.arange(len(matrix)) * width, len(roots))
+		nodes = descend(route, values, codes, offsets, np.repeat(roots, len(matrix)))
+		return route[-1].take(nodes).reshape(len(roots), len(matrix))
+
+
+	def predict_batch(self, rows):
+		"""
+		Classifica uma lista de instâncias de uma vez: as instâncias são codificadas uma única
+		vez, todas as árvores classificam todas juntas e os votos são contados numa matriz.
+		"""
+		codes = self.predict_codes(self.dataset.encode(rows)).astype(np.intp)
+		classes = np.array(self.dataset.classes, dtype=object)
+
+		# Votos em matriz (classe x instância): chave de cada voto é classe * instâncias + instância
+		codes *= len(rows)
+		codes += np.arange(len(rows))
+		votes = np.bincount(codes.ravel(), minlength=len(rows) * len(classes)).reshape(len(classes), len(rows))
+
+		return classes.take(votes.argmax(axis=0)).tolist()
+
+
+	def accuracy_curve(self, instances, checkpoints):
+		"""
+		Acurácia (%) nas instâncias passadas de cada prefixo da floresta: para cada número de
+		árvores em 'checkpoints', usa somente as primeiras árvores. Os votos são acumulados
+		árvore a árvore, então cada árvore classifica as instâncias uma única vez.
+		"""
+		classes = np.array(self.dataset.classes, dtype=object)
+		expected = np.array([instance[-1] for instance in instances], dtype=object)
+		matrix = self.dataset.encode(instances)
+		votes = np.zeros((len(instances), len(classes)), dtype=np.int64)
+		rows = np.arange(len(instances))
+
+		accuracies = {}
+		for ntree, tree_codes in enumerate(self.predict_codes(matrix), 1):
+			votes[rows, tree_codes] += 1
+			if ntree in set(checkpoints):
+				accuracies[ntree] = float((classes[votes.argmax(axis=1)] == expected).mean()) * 100
+
+		return accuracies
+
+
+	def oob_curve(self):
+		"""
+		Estimativa 'Out of Bag' da acurácia da floresta à medida que as árvores são adicionadas.
+		Cada instância de treino é classificada somente pelas árvores que não a sortearam no
+		bootstrap, por votação majoritária. O elemento 't' da lista retornada é a acurácia (%)
+		das 't+1' primeiras árvores, sobre as instâncias que já tiveram ao menos um voto.
+		"""
+		dataset = self.dataset
+		votes = np.zeros((dataset.n_rows, len(dataset.classes)), dtype=np.int64)
+
+		# Colunas do treino já são a matriz codificada das instâncias
+		matrix = np.column_stack(dataset.columns[:-1])
+
+		# Cada árvore classifica somente as instâncias 'Out of Bag' dela, todas as árvores juntas
+		oobs = [decision_tree.boot_test_set for decision_tree in self.decision_trees]
+		route, roots = self.node_pool()
+		oob_rows = np.concatenate(oobs) if oobs else np.zeros(0, dtype=np.intp)
+		values, codes, width = route_values(matrix, dataset.attr_arrays()[0])
+		nodes = descend(route, values, codes, oob_rows * width, np.repeat(roots, [len(oob) for oob in oobs]))
+		oob_codes = route[-1].take(nodes)
+
+		curve = []
+		start = 0
+		for oob in oobs:
+			votes[oob, oob_codes[start:start + len(oob)]] += 1
+			start += len(oob)
+
+			voted = votes.any(axis=1)
+			hits = votes[voted].argmax(axis=1) == dataset.target[voted]
+			curve.append(float(hits.mean()) * 100 if voted.any() else float('nan'))
+
+		return curve
+
+
+	def oob_score(self):
+		""" Acurácia (%) 'Out of Bag' da floresta completa (alternativa barata à validação cruzada) """
+		return self.oob_curve()[-1]
+
+
+	def save(self, path):
+		"""
+		Salva a floresta em formato binário versionado: metadados em JSON (atributos,
+		codificação dos valores categóricos, classes e trecho e raíz de cada árvore) seguidos
+		dos vetores de nodos de todas as árvores concatenados. Vetores compartilhados por
+		várias árvores (floresta compactada) são salvos uma única vez.
+		"""
+		trees = []
+		pools = {}   # Endereço dos vetores de nodos -> (árvore que os salva, início dos nodos e dos filhos)
+		node_total = child_total = 0
+		for decision_tree in self.decision_trees:
+			address = decision_tree.feature.__array_interface__['data'][0]
+			if address not in pools:
+				pools[address] = (decision_tree, node_total, child_total)
+				node_total += len(decision_tree.feature)
+				child_total += len(decision_tree.children)
+			_, node_start, child_start = pools[address]
+			trees.append([node_start, len(decision_tree.feature), child_start, len(decision_tree.children),
+							  int(decision_tree.root)])
+
+		meta = {
+			'dataset': self.dataset.metadata(),
+			'max_height': self.max_height,
+			'extra_trees': self.extra_trees,
+			'ensemble_id': self.ensemble_id,
+			'seed': self.seed,
+			'trees': trees,
+			'arrays': {},
+		}
+
+		# Posição de cada vetor no arquivo (depois do cabeçalho e dos metadados, alinhada em 8 bytes)
+		arrays = {name: np.concatenate([getattr(decision_tree, name) for decision_tree, _, _ in pools.values()])
+					 .astype(dtype) for name, dtype in MODEL_ARRAYS.items()}
+		offset = 0
+		for name, array in arrays.items():
+			meta['arrays'][name] = offset
+			offset += -(-array.nbytes // 8) * 8
+		meta_bytes = json.dumps(meta).encode()
+		start = -(-(MODEL_HEADER.itemsize + len(meta_bytes)) // 8) * 8
+
+		with open(path, 'wb') as fp:
+			fp.write(np.array((MODEL_MAGIC, MODEL_VERSION, len(meta_bytes)), dtype=MODEL_HEADER).tobytes())
+			fp.write(meta_bytes)
+			for name, array in arrays.items():
+				fp.seek(start + meta['arrays'][name])
+				fp.write(array.tobytes())
+			fp.truncate(start + offset)
+
+
+	@classmethod
+	def load(cls, path):
+		"""
+		Carrega floresta salva com 'save', pronta para 'fit' e 'predict_batch' (sem dados de
+		treino). O arquivo é mapeado em memória: os vetores das árvores são visões dele, então
+		processos que carregam o mesmo arquivo compartilham uma única cópia das páginas.
+		"""
+		data = np.memmap(path, dtype=np.uint8, mode='r')
+		header = np.frombuffer(data, MODEL_HEADER, count=1)[0]
+		if header['magic'] != MODEL_MAGIC.rstrip(b"\0"):
+			raise ValueError(f"{path} is not a saved random forest.")
+		if header['version'] != MODEL_VERSION:
+			raise ValueError(f"Unsupported random forest format version {header['version']}.")
+
+		meta_end = MODEL_HEADER.itemsize + int(header['meta_size'])
+		meta = json.loads(bytes(data[MODEL_HEADER.itemsize:meta_end]))
+		start = -(-meta_end // 8) * 8
+
+		forest = cls(len(meta['trees']), meta['max_height'], meta['ensemble_id'], seed = meta['seed'],
+						 extra_trees = meta['extra_trees'])
+		forest.dataset = Dataset.from_metadata(meta['dataset'])
+
+		for node_start, n_nodes, child_start, n_children, root in meta['trees']:
+			decision_tree = DecisionTree(max_height = forest.max_height,
+												  has_sampling = True,
+												  has_bootstrap = True,
+												  extra_trees = forest.extra_trees)
+			decision_tree.attach(forest.dataset)
+			decision_tree.headers = forest.dataset.headers
+			decision_tree.target_attr = forest.dataset.target_attr
+			decision_tree.target_mode = forest.dataset.target_mode
+			decision_tree.classes = forest.dataset.classes
+			decision_tree.root = root
+
+			for name, dtype in MODEL_ARRAYS.items():
+				first, count = (child_start, n_children) if name == 'children' else (node_start, n_nodes)
+				offset = start + meta['arrays'][name] + first * np.dtype(dtype).itemsize
+				setattr(decision_tree, name, np.frombuffer(data, dtype, count=count, offset=offset))
+
+			forest.decision_trees.append(decision_tree)
+
+		return forest
+
+
 	def combine(self, predictions):
-		""" Combinação por votação majoritária das classificações das árvores do ensemble """
-		return max(set(predictions), key=predictions.count)
\ No newline at end of file
+		"""
+		Combinação por votação majoritária das classificações das árvores do ensemble. Empate
+		fica com a classe de menor código (como 'argmax' em 'predict_batch').
+		"""
+		return max(self.dataset.classes, key=predictions.count)
\ No newline at end of file
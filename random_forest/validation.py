@@ -1,9 +1,10 @@
 """
 Criado por: Marcelo Jantsch Wille
 Email: marcelojantschwille@gmail.com
-Última modificação: 20/10/2021
+Última modificação: 19/10/2026
 Descrição: Implementações das funções relevantes para validar
-a generalização do modelo: validação cruzada estratificada.
+a generalização do modelo: validação cruzada estratificada (também para vários
+números de árvores com uma floresta por fold) e estimativa 'Out of Bag' com uma única floresta.
 """
 
 # Módulos de Python
@@ -38,10 +39,9 @@ def cross_validation(data, ntree, K = 10, max_height = None, get_tree_images = F
 		randomForest = Ensemble(ntree, max_height, i)
 		randomForest.generate(train_data, get_tree_images)
 
-		# Tenta prever com a floresta treina cada instância do fold de teste
+		# Tenta prever com a floresta treina todas as instâncias do fold de teste de uma vez
 		errors = 0
-		for instance in test_data:
-			prediction = randomForest.fit(instance)
+		for instance, prediction in zip(test_data, randomForest.predict_batch(test_data)):
 			if prediction != instance[-1]:
 				errors += 1
 
@@ -56,6 +56,33 @@ def cross_validation(data, ntree, K = 10, max_height = None, get_tree_images = F
 
 
 
+def cross_validation_curve(data, ntrees, K = 10, max_height = None):
+	"""
+	Validação cruzada para vários números de árvores: em cada fold treina uma única floresta
+	com o maior valor de 'ntrees' e mede a acurácia de cada prefixo dela no fold de teste.
+	Retorna {ntree: (média, desvio padrão) das acurácias}.
+	"""
+
+	headers = data[0]
+
+	# Acurácias de cada número de árvores em cada fold
+	accuracies = {ntree: [] for ntree in ntrees}
+
+	folds = get_folds(K, data[1:])
+	for i in range(K):
+		test_data = folds[i]
+		train_data = glue_folds_together(headers, folds[:i] + folds[i+1:])
+
+		randomForest = Ensemble(max(ntrees), max_height, i)
+		randomForest.generate(train_data)
+
+		for ntree, accuracy in randomForest.accuracy_curve(test_data, ntrees).items():
+			accuracies[ntree].append(accuracy)
+
+	return {ntree: (mean(values), stdev(values)) for ntree, values in accuracies.items()}
+
+
+
 def get_folds(k, data):
 	""" Faz estratificação dos dados, mantendo a mesma proporção das classes de target entre folds """
 
@@ -95,4 +122,16 @@ def glue_folds_together(headers, folds):
 	for fold in folds:
 		for instance in fold:
 			train_data.append(instance)
-	return train_data
\ No newline at end of file
+	return train_data
+
+
+def oob_validation(data, ntree, max_height = None):
+	"""
+	Treina uma única floresta com todos os dados e estima a acurácia pelas instâncias 'Out of Bag'.
+	Retorna acurácia da floresta completa e a curva de acurácia conforme as árvores são adicionadas.
+	"""
+	randomForest = Ensemble(ntree, max_height)
+	randomForest.generate(data)
+
+	curve = randomForest.oob_curve()
+	return curve[-1], curve